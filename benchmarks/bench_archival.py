@@ -0,0 +1,118 @@
+"""
+Hot-table reads before and after archiving closed applications.
+
+Usage:
+    python benchmarks/bench_archival.py [--rows 1000000] [--database-url sqlite:///archival_bench.db]
+
+Populates a fresh database with synthetic applications, most of them closed
+and older than ARCHIVE_APPLICATIONS_AFTER_DAYS, and reports p50/p95 latency
+of the GET /applications filters (by job, by status, first page) on the hot
+table, then again after archive_all() has moved the closed rows out.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=1_000_000)
+parser.add_argument("--jobs", type=int, default=20_000)
+parser.add_argument("--closed-ratio", type=float, default=0.9)
+parser.add_argument("--repeat", type=int, default=50)
+parser.add_argument("--database-url", default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'archival_bench.db')}")
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = args.database_url
+os.environ.setdefault("QUERY_CACHE_BACKEND", "none")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import func, insert  # noqa: E402
+
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import models  # noqa: E402
+from app.services import archival  # noqa: E402
+
+OPEN_STATUSES = ["Pending", "Reviewed", "Interview"]
+CLOSED_STATUSES = ["Rejected", "Hired", "Withdrawn"]
+BATCH = 50_000
+
+
+def populate(db):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    now = datetime.now(timezone.utc)
+    db.execute(insert(models.JobPosting.__table__), [
+        {"id": i, "title": f"Job {i}", "created_at": now} for i in range(1, args.jobs + 1)
+    ])
+    for start in range(0, args.rows, BATCH):
+        rows = []
+        for i in range(start, min(start + BATCH, args.rows)):
+            closed = rng.random() < args.closed_ratio
+            rows.append({
+                "job_id": rng.randint(1, args.jobs),
+                "candidate_id": f"cand{i}",
+                "name": f"Candidate {i}",
+                "email": f"cand{i}@example.com",
+                "status": rng.choice(CLOSED_STATUSES if closed else OPEN_STATUSES),
+                "created_at": now - timedelta(days=rng.randint(400, 1000) if closed else rng.randint(0, 30)),
+            })
+        db.execute(insert(models.Application.__table__), rows)
+        db.commit()
+        print(f"  {min(start + BATCH, args.rows):,} applications", file=sys.stderr)
+
+
+def queries(rng):
+    Application = models.Application
+    return {
+        "by job": lambda db: db.query(Application).filter(
+            Application.job_id == rng.randint(1, args.jobs)
+        ).limit(100).all(),
+        "by status": lambda db: db.query(Application).filter(
+            Application.status == rng.choice(OPEN_STATUSES)
+        ).offset(rng.randint(0, 1000)).limit(100).all(),
+        "first page": lambda db: db.query(Application).offset(0).limit(100).all(),
+        "count": lambda db: db.query(func.count(Application.id)).scalar(),
+    }
+
+
+def timed(label, fn, db, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(db)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<24} p50={statistics.median(samples):9.2f}ms p95={p95:9.2f}ms")
+
+
+def run_all(db, phase):
+    for name, fn in queries(random.Random(11)).items():
+        timed(f"{phase} {name}", fn, db, args.repeat)
+
+
+def main():
+    db = SessionLocal()
+    try:
+        print(f"Populating {args.rows:,} applications at {args.database_url}", file=sys.stderr)
+        populate(db)
+        run_all(db, "before")
+        start = time.perf_counter()
+        moved = archival.archive_all(db)
+        print(
+            f"archived {moved['applications']:,} applications, {moved['jobs']:,} jobs "
+            f"in {(time.perf_counter() - start):.1f}s"
+        )
+        run_all(db, "after")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
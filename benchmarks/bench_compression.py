@@ -0,0 +1,105 @@
+"""
+Response compression: CPU time vs bytes saved per encoding and level.
+
+Usage:
+    python benchmarks/bench_compression.py [--postings 100] [--description-bytes 3000] [--frames 400]
+
+Builds a GET /jobs-style JSON list of --postings postings with multi-KB
+descriptions and an SSE stream of --frames small change-feed frames, then
+compresses both with every available encoding (gzip always, br and zstd
+when brotli / zstandard are installed) at a range of levels. The list is
+compressed in one go like a buffered response; the stream is flushed after
+every frame like CompressionMiddleware does.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--postings", type=int, default=100)
+parser.add_argument("--description-bytes", type=int, default=3000)
+parser.add_argument("--frames", type=int, default=400)
+parser.add_argument("--repeat", type=int, default=20)
+args = parser.parse_args()
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app.api.compression import available_encodings  # noqa: E402
+
+LEVELS = {"gzip": [1, 4, 6, 9], "br": [1, 4, 5, 6, 9, 11], "zstd": [1, 3, 6, 9, 19]}
+WORDS = (
+    "python backend engineer team remote experience services api design build scale data "
+    "customers product platform cloud postgres kubernetes ownership mentor hiring benefits "
+    "salary equity flexible growth impact collaborate responsibilities requirements years"
+).split()
+
+
+def sentence(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + "."
+
+
+def description(rng, size):
+    parts = []
+    while sum(len(part) for part in parts) < size:
+        parts.append(sentence(rng))
+    return " ".join(parts)
+
+
+def job_list(rng):
+    return json.dumps([
+        {
+            "id": i,
+            "title": f"{rng.choice(WORDS).title()} Engineer",
+            "company_id": rng.randint(1, 50),
+            "location": rng.choice(["Remote", "New York, NY", "Austin, TX", "Berlin"]),
+            "description": description(rng, args.description_bytes),
+            "requirements": description(rng, args.description_bytes // 3),
+            "required_skills": rng.sample(WORDS, 6),
+            "created_at": "2026-10-01T12:00:00",
+        }
+        for i in range(args.postings)
+    ]).encode()
+
+
+def sse_frames(rng):
+    return [
+        f"id: {i}\ndata: {json.dumps({'type': rng.choice(['job', 'application']), 'action': 'updated', 'job_id': rng.randint(1, 5000), 'company_id': rng.randint(1, 50)})}\n\n".encode()
+        for i in range(args.frames)
+    ]
+
+
+def timed(fn):
+    samples = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        size = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), size
+
+
+rng = random.Random(42)
+body = job_list(rng)
+frames = sse_frames(rng)
+stream_bytes = sum(len(frame) for frame in frames)
+print(f"job list: {len(body) / 1024:.1f} KiB, SSE stream: {len(frames)} frames, {stream_bytes / 1024:.1f} KiB")
+print(f"{'encoding':<10}{'level':>6}{'list ms':>10}{'list %':>9}{'MB/s':>9}{'stream ms':>11}{'stream %':>10}")
+
+for name, stream_class in available_encodings().items():
+    for level in LEVELS[name]:
+        def whole():
+            return len(stream_class(level).finish(body))
+
+        def streamed():
+            stream = stream_class(level)
+            return sum(len(stream.flush(frame)) for frame in frames) + len(stream.finish())
+
+        list_ms, list_size = timed(whole)
+        stream_ms, stream_size = timed(streamed)
+        print(
+            f"{name:<10}{level:>6}{list_ms:>10.2f}{100 * list_size / len(body):>8.1f}%"
+            f"{len(body) / 1e6 / (list_ms / 1000):>9.0f}{stream_ms:>11.2f}{100 * stream_size / stream_bytes:>9.1f}%"
+        )
@@ -0,0 +1,143 @@
+"""
+Facet counts at scale: aggregate-table reads vs GROUP BY over JobPosting.
+
+Usage:
+    python benchmarks/bench_facets.py [--rows 1000000] [--database-url sqlite:///facets_bench.db]
+
+Populates a fresh database (SQLite by default, or any DATABASE_URL) with
+synthetic postings and applications, rebuilds the FacetCount table, spreads
+every value over all FACET_COUNTER_SHARDS shards as live writes eventually
+do, and reports p50/p95 latency of reading every facet both ways, then
+again after facets.rollup() has folded the shards back into one row per value.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--rows", type=int, default=1_000_000)
+parser.add_argument("--companies", type=int, default=5_000)
+parser.add_argument("--repeat", type=int, default=50)
+parser.add_argument("--database-url", default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'facets_bench.db')}")
+args = parser.parse_args()
+
+os.environ["DATABASE_URL"] = args.database_url
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sqlalchemy import func, insert  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models import models  # noqa: E402
+from app.services import facets  # noqa: E402
+
+LOCATIONS = [f"City {i}" for i in range(300)] + [None]
+INDUSTRIES = ["tech", "finance", "health", "retail", "energy", "education", None]
+STATUSES = ["Pending", "Reviewed", "Interview", "Rejected", "Hired"]
+BATCH = 50_000
+
+
+def populate(db):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    db.execute(insert(models.Company.__table__), [
+        {"id": i, "name": f"Company {i}", "industry": rng.choice(INDUSTRIES)}
+        for i in range(1, args.companies + 1)
+    ])
+    for start in range(0, args.rows, BATCH):
+        db.execute(insert(models.JobPosting.__table__), [
+            {
+                "id": i + 1,
+                "title": f"Job {i}",
+                "company_id": rng.randint(1, args.companies),
+                "location": rng.choice(LOCATIONS),
+            }
+            for i in range(start, min(start + BATCH, args.rows))
+        ])
+        db.execute(insert(models.Application.__table__), [
+            {
+                "job_id": rng.randint(1, args.rows),
+                "candidate_id": f"cand{i}",
+                "name": f"Candidate {i}",
+                "email": f"cand{i}@example.com",
+                "status": rng.choice(STATUSES),
+            }
+            for i in range(start, min(start + BATCH, args.rows))
+        ])
+        db.commit()
+        print(f"  {min(start + BATCH, args.rows):,} postings", file=sys.stderr)
+
+
+def spread(db):
+    """
+    Split every value's count over all shards, the worst case for reads.
+    """
+    shards = max(settings.FACET_COUNTER_SHARDS, 1)
+    rows = db.query(models.FacetCount.facet, models.FacetCount.value, models.FacetCount.count).all()
+    for shard in range(1, shards):
+        facets.adjust(db, {(facet, value): count // shards for facet, value, count in rows}, shard=shard)
+    facets.adjust(db, {(facet, value): -(count // shards) * (shards - 1) for facet, value, count in rows}, shard=0)
+    db.commit()
+
+
+def group_by_facets(db):
+    JobPosting = models.JobPosting
+    result = {
+        "location": db.query(JobPosting.location, func.count()).group_by(JobPosting.location)
+        .order_by(func.count().desc()).limit(20).all(),
+        "company": db.query(JobPosting.company_id, func.count()).group_by(JobPosting.company_id)
+        .order_by(func.count().desc()).limit(20).all(),
+        "industry": db.query(models.Company.industry, func.count(JobPosting.id)).select_from(JobPosting)
+        .outerjoin(models.Company, models.Company.id == JobPosting.company_id)
+        .group_by(models.Company.industry).order_by(func.count(JobPosting.id).desc()).limit(20).all(),
+        "status": db.query(models.Application.status, func.count()).group_by(models.Application.status).all(),
+    }
+    return result
+
+
+def aggregate_facets(db):
+    result = facets.read(db, facets.JOB_FACETS, "job", limit=20)
+    result.update(facets.read(db, facets.APPLICATION_FACETS, "application", limit=100))
+    return result
+
+
+def timed(label, fn, db, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(db)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<18} p50={statistics.median(samples):9.2f}ms p95={p95:9.2f}ms")
+
+
+def main():
+    db = SessionLocal()
+    try:
+        print(f"Populating {args.rows:,} postings at {args.database_url}", file=sys.stderr)
+        populate(db)
+        start = time.perf_counter()
+        facets.rebuild(db)
+        print(f"rebuild            {(time.perf_counter() - start) * 1000:9.2f}ms")
+        spread(db)
+        print(f"FacetCount rows    {db.query(models.FacetCount).count():9,}")
+        timed("FacetCount read", aggregate_facets, db, args.repeat)
+        timed("GROUP BY scan", group_by_facets, db, max(3, args.repeat // 10))
+        start = time.perf_counter()
+        facets.rollup(db)
+        print(f"rollup             {(time.perf_counter() - start) * 1000:9.2f}ms")
+        print(f"FacetCount rows    {db.query(models.FacetCount).count():9,}")
+        timed("rolled-up read", aggregate_facets, db, args.repeat)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Compare per-chunk SSE framing with the coalescing ChunkBatcher.
+
+Usage:
+    python benchmarks/bench_streaming.py [--tokens 800] [--delay-ms 0.5]
+
+Reports bytes, frames and CPU time per generated description.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app.services.streaming import ChunkBatcher  # noqa: E402
+
+
+async def fake_model_stream(tokens, delay):
+    for i in range(tokens):
+        if delay:
+            await asyncio.sleep(delay)
+        yield f" tok{i % 97}"
+
+
+async def per_chunk(tokens, delay):
+    frames = 0
+    sent = 0
+    full_description = ""
+    async for chunk in fake_model_stream(tokens, delay):
+        frame = f"data: {json.dumps({'chunk': chunk})}\n\n".encode("utf-8")
+        full_description += chunk
+        frames += 1
+        sent += len(frame)
+    return frames, sent, len(full_description)
+
+
+async def batched(tokens, delay, max_bytes, interval_ms):
+    batcher = ChunkBatcher(max_bytes=max_bytes, flush_interval_ms=interval_ms)
+    async for _ in batcher.frames(fake_model_stream(tokens, delay)):
+        pass
+    return batcher.frames_sent, batcher.bytes_sent, len(batcher.text)
+
+
+def measure(label, coro):
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    frames, sent, chars = asyncio.run(coro)
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    print(f"{label:<28} frames={frames:>6} bytes={sent:>8} chars={chars:>7} "
+          f"cpu={cpu * 1000:8.2f}ms wall={wall * 1000:8.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=800)
+    parser.add_argument("--delay-ms", type=float, default=0.5)
+    args = parser.parse_args()
+    delay = args.delay_ms / 1000
+
+    measure("per-chunk", per_chunk(args.tokens, delay))
+    for max_bytes, interval_ms in [(256, 5), (512, 15), (2048, 50)]:
+        measure(f"batched {max_bytes}B/{interval_ms}ms", batched(args.tokens, delay, max_bytes, interval_ms))
+
+
+if __name__ == "__main__":
+    main()
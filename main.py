@@ -1,13 +1,24 @@
-from fastapi import FastAPI, Query, Path, Depends, HTTPException
+from fastapi import FastAPI, Query, Path, Depends, HTTPException, Request
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from sqlalchemy import create_engine, Column, Integer, String, text
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 import os
+from app.api.compression import add_compression
 from app.api.endpoints import companies
+from app.api.profiling import add_profiling
+from app.api.read_your_writes import add_read_your_writes
+from app.db.session import get_db
+from app.models import models
+from app.services import dedup
+from app.services.change_feed import change_feed
+from app.services.query_cache import job_posting_counters, query_cache
+from app.services.streaming import ChunkBatcher, SSE_HEADERS, sse_event
+from app.services.job_descriptions import DESCRIPTION_SCHEMA_VERSION, normalize_skills, rendered_description
 from datetime import datetime
 import openai
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from langchain_openai import ChatOpenAI
@@ -41,8 +52,6 @@ except Exception as e:
     print(f"Error connecting to the database: {str(e)}")
     raise
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 app = FastAPI()
 
 # Add CORS middleware
@@ -53,6 +62,9 @@ app.add_middleware(
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
 )
+add_compression(app)
+add_read_your_writes(app)
+add_profiling(app)
 
 # This is our data model - what an application looks like
 class Candidate(BaseModel):
@@ -78,14 +90,6 @@ class JobDescriptionRequest(BaseModel):
 # This is our "database" - just a list in memory - cache memory
 applications: List[Candidate] = []
 
-#creating a db connection session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()    
-
 # Initialize LangChain chat model
 def init_chat_model():
     return ChatOpenAI(
@@ -145,21 +149,49 @@ def create_prompt_template():
     human_message_prompt = HumanMessagePromptTemplate.from_template(HUMAN_TEMPLATE)
     return ChatPromptTemplate.from_messages([system_message_prompt, human_message_prompt])
 
+def save_job_description(db: Session, job_id: int, job_description: JobDescriptionComponents):
+    # Through the ORM so JSONType and updated_at's onupdate work on SQLite too
+    db_job = db.get(models.JobPosting, job_id)
+    db_job.description = None
+    db_job.description_data = job_description.dict()
+    db_job.description_version = DESCRIPTION_SCHEMA_VERSION
+    db_job.required_skills = normalize_skills(job_description.required_skills)
+    # Keep the near-duplicate index in step with the new description
+    dedup.index_posting(db, db_job)
+    db.commit()
+    query_cache.invalidate(*job_posting_counters(db_job.company_id))
+    change_feed.publish("job", "updated", job_id=job_id, company_id=db_job.company_id)
+
+def job_row(row):
+    # Convert the row to a dictionary and handle datetime objects
+    job_dict = dict(row._mapping)
+    # Convert datetime objects to ISO format strings
+    if job_dict.get('created_at'):
+        job_dict['created_at'] = job_dict['created_at'].isoformat()
+    job_dict['description'] = rendered_description(
+        job_dict['id'], job_dict.get('description'), job_dict.get('description_data'),
+        job_dict.get('description_version'), job_dict.get('updated_at')
+    )
+    if job_dict.get('updated_at'):
+        job_dict['updated_at'] = job_dict['updated_at'].isoformat()
+    return job_dict
+
 @app.get("/jobs")
-def get_all_job_postings(db: Session = Depends(get_db)):
+def get_all_job_postings(
+    request: Request,
+    format: str = Query("json", pattern="^(json|ndjson)$", description="ndjson streams one posting per line"),
+    db: Session = Depends(get_db)
+):
+    if format == "ndjson" or "application/x-ndjson" in request.headers.get("accept", ""):
+        def generate():
+            result = db.execute(text('SELECT * FROM "JobPosting"').execution_options(yield_per=100))
+            for rows in result.partitions():
+                yield "".join(json.dumps(job_row(row), default=str) + "\n" for row in rows)
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
     result = db.execute(text('SELECT * FROM "JobPosting"'))
-    rows = result.fetchall()
-    output = []
-    for row in rows:
-        # Convert the row to a dictionary and handle datetime objects
-        job_dict = dict(row._mapping)
-        # Convert datetime objects to ISO format strings
-        if job_dict.get('created_at'):
-            job_dict['created_at'] = job_dict['created_at'].isoformat()
-        if job_dict.get('updated_at'):
-            job_dict['updated_at'] = job_dict['updated_at'].isoformat()
-        output.append(job_dict)
-    return output
+    return [job_row(row) for row in result.fetchall()]
 
 @app.get("/jobs/{job_id}")
 def get_job_posting(job_id: int, db: Session = Depends(get_db)):
@@ -172,7 +204,12 @@ def get_job_posting(job_id: int, db: Session = Depends(get_db)):
     if not job:
         return {"error": "Job not found"}
     
-    return dict(job._mapping)
+    job_dict = dict(job._mapping)
+    job_dict['description'] = rendered_description(
+        job_dict['id'], job_dict.get('description'), job_dict.get('description_data'),
+        job_dict.get('description_version'), job_dict.get('updated_at')
+    )
+    return job_dict
 
 @app.post("/jobs/{job_id}/description/stream")
 async def generate_job_description(
@@ -218,61 +255,28 @@ async def generate_job_description(
                     company_culture=request.company_culture or "Not specified"
                 )
 
-                # Stream the response
-                async for chunk in chat_model.astream(formatted_prompt):
-                    if chunk.content:
-                        # Send each chunk as it arrives
-                        yield f"data: {json.dumps({'chunk': chunk.content})}\n\n".encode('utf-8')
+                # Stream the response, coalescing model chunks into batched frames
+                batcher = ChunkBatcher()
+                chunks = (chunk.content async for chunk in chat_model.astream(formatted_prompt))
+                async for frame in batcher.frames(chunks):
+                    yield frame
 
-                # Get the final response
-                response = await chat_model.ainvoke(formatted_prompt)
-                job_description = output_parser.parse(response.content)
+                # Parse the streamed text instead of generating it a second time
+                job_description = output_parser.parse(batcher.text)
 
                 # Send the final complete response
-                yield f"data: {job_description.json()}\n\n".encode('utf-8')
+                yield sse_event(job_description.dict())
 
-                # Update the job posting with the complete description
-                formatted_description = f"""
-Title: {job_description.title}
-
-Overview:
-{job_description.overview}
-
-Responsibilities:
-{chr(10).join(f"• {resp}" for resp in job_description.responsibilities)}
-
-Required Skills:
-{chr(10).join(f"• {skill}" for skill in job_description.required_skills)}
-
-Qualifications:
-{chr(10).join(f"• {qual}" for qual in job_description.qualifications)}
-
-Benefits:
-{chr(10).join(f"• {benefit}" for benefit in job_description.benefits)}
-
-Company Culture:
-{job_description.company_culture if job_description.company_culture else "Not specified"}
-"""
-
-                # Save to database
-                db.execute(
-                    text('UPDATE "JobPosting" SET description = :description WHERE id = :job_id'),
-                    {"description": formatted_description, "job_id": job_id}
-                )
-                db.commit()
+                # Store the structured components; text is rendered on read
+                await run_in_threadpool(save_job_description, db, job_id, job_description)
 
             except Exception as e:
-                error_message = f"data: {json.dumps({'error': str(e)})}\n\n".encode('utf-8')
-                yield error_message
+                yield sse_event({'error': str(e)})
 
         return StreamingResponse(
             generate(),
             media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "X-Accel-Buffering": "no"
-            }
+            headers=SSE_HEADERS
         )
 
     except Exception as e:
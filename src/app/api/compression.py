@@ -0,0 +1,201 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+gzip is always available; br and zstd are offered when the brotli and
+zstandard packages are installed. Among the encodings the client accepts,
+the highest q-value wins and ties go to the COMPRESSION_ENCODINGS order.
+
+Buffered responses (JSON lists) are compressed in one go once they reach
+COMPRESSION_MIN_BYTES. Streamed responses (SSE, NDJSON) go through one
+compressor for the whole stream that is flushed after every body message, so
+each frame reaches the client as soon as it is sent while later frames still
+compress against the earlier ones.
+"""
+import zlib
+from typing import Callable, Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+
+class GzipStream:
+    def __init__(self, level: int):
+        # wbits 31 = gzip header and trailer
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def flush(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliStream:
+    def __init__(self, quality: int):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def flush(self, data: bytes) -> bytes:
+        return self.compressor.process(data) + self.compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self.compressor.process(data) + self.compressor.finish()
+
+
+class ZstdStream:
+    def __init__(self, level: int):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def flush(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self.compressor.compress(data) + self.compressor.flush()
+
+
+def available_encodings() -> Dict[str, Callable[[int], object]]:
+    encodings = {"gzip": GzipStream}
+    if brotli is not None:
+        encodings["br"] = BrotliStream
+    if zstandard is not None:
+        encodings["zstd"] = ZstdStream
+    return encodings
+
+
+def negotiate(accept_encoding: str, preferred: List[str]) -> Optional[str]:
+    """
+    The encoding in `preferred` the client accepts with the highest q-value,
+    or None when it accepts none of them.
+    """
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in preferred:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers:
+        return False
+    content_type = headers.get("content-type", "").lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) or "+json" in content_type
+
+
+class CompressionMiddleware:
+    def __init__(self, app, encodings: List[str], min_bytes: int, levels: Dict[str, int]):
+        self.app = app
+        available = available_encodings()
+        self.streams = {name: available[name] for name in encodings if name in available}
+        self.preferred = list(self.streams)
+        self.min_bytes = min_bytes
+        self.levels = levels
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.preferred)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        stream = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, stream, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(scope=start)
+                if start["status"] in (204, 304) or not is_compressible(headers):
+                    passthrough = True
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.min_bytes:
+                    passthrough = True
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+
+                stream = self.streams[encoding](self.levels[encoding])
+                headers["Content-Encoding"] = encoding
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = stream.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    start = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+                start = None
+
+            if more_body and not body:
+                return
+            body = stream.flush(body) if more_body else stream.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+def add_compression(app):
+    if settings.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            encodings=[name.strip() for name in settings.COMPRESSION_ENCODINGS.split(",") if name.strip()],
+            min_bytes=settings.COMPRESSION_MIN_BYTES,
+            levels={
+                "gzip": settings.COMPRESSION_GZIP_LEVEL,
+                "br": settings.COMPRESSION_BROTLI_QUALITY,
+                "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+            }
+        )
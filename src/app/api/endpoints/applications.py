@@ -1,26 +1,120 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from app.db.session import get_db
 from app.models import models
 from app.schemas import schemas
+from app.api.projection import column_names, load_columns, parse_fields, partial_schema, project
+from app.api.profiling import ProfiledRoute
+from app.services import archival, facets, skills
+from app.services.change_feed import change_feed
+from app.services.write_behind import write_behind
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-@router.post("/", response_model=schemas.Application)
+def company_of_job(db: Session, job_id: Optional[int]) -> Optional[int]:
+    return db.query(models.JobPosting.company_id).filter(models.JobPosting.id == job_id).scalar()
+
+def commit_application(db: Session):
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Candidate has already applied to this job posting")
+
+def resume_targets(db: Session, uploads: List[schemas.ResumeUploadItem]) -> Tuple[Dict, Dict, Dict]:
+    """
+    The uploads' applications and postings, and each posting's skills.
+    """
+    ids = {upload.application_id for upload in uploads}
+    applications = {
+        application.id: application
+        for application in db.query(models.Application).filter(models.Application.id.in_(ids))
+    }
+    missing = ids - set(applications)
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Application(s) not found: {', '.join(str(i) for i in sorted(missing))}"
+        )
+    jobs = {
+        job.id: job for job in db.query(models.JobPosting).filter(
+            models.JobPosting.id.in_({application.job_id for application in applications.values()})
+        )
+    }
+    # The posting's own required skills count as dictionary entries for its applicants
+    required = {job_id: skills.job_skills(job) for job_id, job in jobs.items()}
+    return applications, jobs, required
+
+def save_resume_skills(
+    db: Session,
+    uploads: List[schemas.ResumeUploadItem],
+    found: List[List[str]],
+    applications: Dict,
+    jobs: Dict
+):
+    skill_ids = skills.intern_skills(db, {name for names in found for name in names})
+    for upload, names in zip(uploads, found):
+        applications[upload.application_id].skill_bits = skills.pack_bits(skill_ids[name] for name in names)
+    job_ids = {application_id: application.job_id for application_id, application in applications.items()}
+    db.commit()
+    for application_id, job_id in job_ids.items():
+        change_feed.publish(
+            "application", "updated",
+            application_id=application_id, job_id=job_id, company_id=getattr(jobs.get(job_id), "company_id", None)
+        )
+
+async def store_resumes(db: Session, uploads: List[schemas.ResumeUploadItem]) -> List[schemas.ResumeSkills]:
+    """
+    Extract skills from each resume in the process pool and store them on
+    the application as a skill bitset. The database work runs in the
+    threadpool so it doesn't block the event loop.
+    """
+    applications, jobs, required = await run_in_threadpool(resume_targets, db, uploads)
+    found = await skills.extract_in_pool([
+        (upload.resume_text, required.get(applications[upload.application_id].job_id, []))
+        for upload in uploads
+    ])
+    await run_in_threadpool(save_resume_skills, db, uploads, found, applications, jobs)
+    return [
+        schemas.ResumeSkills(application_id=upload.application_id, skills=names)
+        for upload, names in zip(uploads, found)
+    ]
+
+@router.post(
+    "/",
+    response_model=schemas.Application,
+    responses={202: {"model": schemas.ApplicationAccepted, "description": "Queued for write-behind insert"}}
+)
 def create_application(application: schemas.ApplicationCreate, db: Session = Depends(get_db)):
     # Verify job posting exists
-    job = db.query(models.JobPosting).filter(models.JobPosting.id == application.job_id).first()
+    job = db.query(models.JobPosting.id, models.JobPosting.company_id).filter(
+        models.JobPosting.id == application.job_id
+    ).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job posting not found")
     
+    if write_behind is not None:
+        write_behind.submit(application)
+        accepted = schemas.ApplicationAccepted(job_id=application.job_id, candidate_id=application.candidate_id)
+        return JSONResponse(status_code=202, content=accepted.model_dump())
+
     db_application = models.Application(**application.dict())
     db.add(db_application)
-    db.commit()
+    facets.apply(db, after=facets.application_values(db_application))
+    commit_application(db)
+    change_feed.publish(
+        "application", "created",
+        application_id=db_application.id, job_id=job.id, company_id=job.company_id
+    )
     db.refresh(db_application)
     return db_application
 
-@router.get("/", response_model=List[schemas.Application])
+@router.get("/", response_model=List[partial_schema(schemas.Application)], response_model_exclude_unset=True)
 def read_applications(
     skip: int = 0,
     limit: int = 100,
@@ -28,27 +122,97 @@ def read_applications(
     candidate_id: Optional[str] = None,
     email: Optional[str] = None,
     status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    include_archived: bool = Query(False, description="Also return archived applications"),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.Application)
-    
-    if job_id:
-        query = query.filter(models.Application.job_id == job_id)
-    if candidate_id:
-        query = query.filter(models.Application.candidate_id == candidate_id)
-    if email:
-        query = query.filter(models.Application.email == email)
-    if status:
-        query = query.filter(models.Application.status == status)
-    
-    return query.offset(skip).limit(limit).all()
+    selected = parse_fields(fields, schemas.Application)
 
-@router.get("/{application_id}", response_model=schemas.Application)
-def read_application(application_id: int, db: Session = Depends(get_db)):
-    db_application = db.query(models.Application).filter(models.Application.id == application_id).first()
+    # Takes a table's columns so the same filters apply to the archive table
+    def where(c):
+        clauses = []
+        if job_id:
+            clauses.append(c.job_id == job_id)
+        if candidate_id:
+            clauses.append(c.candidate_id == candidate_id)
+        if email:
+            clauses.append(c.email == email)
+        if status:
+            clauses.append(c.status == status)
+        return clauses
+
+    if include_archived:
+        rows = archival.read_with_archive(
+            db, models.Application, models.ApplicationArchive, column_names(selected), where, skip, limit
+        )
+        return project(rows, schemas.Application, selected)
+
+    query = (
+        db.query(models.Application)
+        .options(load_columns(models.Application, selected))
+        .filter(*where(models.Application.__table__.c))
+    )
+    return project(query.offset(skip).limit(limit).all(), schemas.Application, selected)
+
+@router.post("/resumes", response_model=List[schemas.ResumeSkills])
+async def upload_resumes(uploads: List[schemas.ResumeUploadItem], db: Session = Depends(get_db)):
+    """
+    Extract and store the skills of many resumes at once.
+    """
+    if not uploads:
+        return []
+    return await store_resumes(db, uploads)
+
+@router.get("/stats", response_model=Dict[str, List[schemas.FacetValue]])
+def read_application_stats(
+    job_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Application counts by status, overall or for one job posting.
+    """
+    if job_id is None:
+        return facets.read(db, facets.APPLICATION_FACETS, "application", limit=100)
+
+    rows = (
+        db.query(models.Application.status, func.count(models.Application.id))
+        .filter(models.Application.job_id == job_id)
+        .group_by(models.Application.status)
+        .order_by(func.count(models.Application.id).desc())
+        .all()
+    )
+    return {"status": [{"value": status, "count": count} for status, count in rows]}
+
+@router.get("/{application_id}", response_model=partial_schema(schemas.Application), response_model_exclude_unset=True)
+def read_application(
+    application_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    include_archived: bool = Query(False, description="Also look in archived applications"),
+    db: Session = Depends(get_db)
+):
+    selected = parse_fields(fields, schemas.Application)
+    db_application = (
+        db.query(models.Application)
+        .options(load_columns(models.Application, selected))
+        .filter(models.Application.id == application_id)
+        .first()
+    )
+    if db_application is None and include_archived:
+        archive = models.ApplicationArchive
+        db_application = db.execute(
+            select(archive).where(archive.c.id == application_id)
+        ).mappings().first()
     if db_application is None:
         raise HTTPException(status_code=404, detail="Application not found")
-    return db_application
+    return project([db_application], schemas.Application, selected)[0]
+
+@router.post("/{application_id}/resume", response_model=schemas.ResumeSkills)
+async def upload_resume(application_id: int, upload: schemas.ResumeUpload, db: Session = Depends(get_db)):
+    """
+    Extract the skills in a resume and store them on the application.
+    """
+    item = schemas.ResumeUploadItem(application_id=application_id, resume_text=upload.resume_text)
+    return (await store_resumes(db, [item]))[0]
 
 @router.put("/{application_id}", response_model=schemas.Application)
 def update_application(
@@ -66,10 +230,17 @@ def update_application(
         if not job:
             raise HTTPException(status_code=404, detail="Job posting not found")
     
+    before = facets.application_values(db_application)
     for key, value in application.dict(exclude_unset=True).items():
         setattr(db_application, key, value)
     
-    db.commit()
+    facets.apply(db, before, facets.application_values(db_application))
+    commit_application(db)
+    change_feed.publish(
+        "application", "updated",
+        application_id=application_id, job_id=db_application.job_id,
+        company_id=company_of_job(db, db_application.job_id)
+    )
     db.refresh(db_application)
     return db_application
 
@@ -79,6 +250,12 @@ def delete_application(application_id: int, db: Session = Depends(get_db)):
     if db_application is None:
         raise HTTPException(status_code=404, detail="Application not found")
     
+    job_id = db_application.job_id
+    facets.apply(db, before=facets.application_values(db_application))
     db.delete(db_application)
     db.commit()
+    change_feed.publish(
+        "application", "deleted",
+        application_id=application_id, job_id=job_id, company_id=company_of_job(db, job_id)
+    )
     return {"message": "Application deleted successfully"} 
\ No newline at end of file
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.change_feed import TYPES, change_feed
+from app.services.streaming import SSE_HEADERS
+
+router = APIRouter()
+
+@router.get("/")
+async def stream_changes(
+    company_id: Optional[int] = Query(None, description="Only changes to this company's postings and their applications"),
+    job_id: Optional[int] = Query(None, description="Only changes to this posting and its applications"),
+    type: List[str] = Query(list(TYPES), description="Kinds of change to send: job, application"),
+    last_event_id: Optional[int] = Query(None, description="Resume after this event; the Last-Event-ID header also works"),
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-sent events for created, updated and deleted job postings and
+    applications. Events carry `id:` sequence numbers; a `reset` event means
+    changes were missed and lists should be refetched.
+    """
+    unknown = set(type) - set(TYPES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown change type(s): {', '.join(sorted(unknown))}")
+    types = set(type)
+
+    def matches(event):
+        return (
+            event["type"] in types
+            and (company_id is None or event.get("company_id") == company_id)
+            and (job_id is None or event.get("job_id") == job_id)
+        )
+
+    # EventSource sends the header on reconnect; the parameter is for the first connection
+    resume_from = last_event_id_header if last_event_id_header is not None else last_event_id
+    return StreamingResponse(
+        change_feed.events(resume_from, matches, keepalive=settings.CHANGE_FEED_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
@@ -2,38 +2,66 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
-from app.db.session import get_db
+from app.db.session import get_db, replica_lag_window
 from app.models import models
 from app.schemas import schemas
+from app.api.projection import load_columns, parse_fields, partial_schema, project
+from app.api.profiling import ProfiledRoute
+from app.services import facets
+from app.services.query_cache import query_cache, table_epoch
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.post("/", response_model=schemas.Company)
 def create_company(company: schemas.CompanyCreate, db: Session = Depends(get_db)):
     db_company = models.Company(**company.dict())
     db.add(db_company)
     db.commit()
+    query_cache.invalidate("Company")
     db.refresh(db_company)
     return db_company
 
-@router.get("/", response_model=List[schemas.Company])
+@router.get("/", response_model=List[partial_schema(schemas.Company)], response_model_exclude_unset=True)
 def read_companies(
     skip: int = 0,
     limit: int = 100,
     industry: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.Company)
-    if industry:
-        query = query.filter(models.Company.industry == industry)
-    return query.offset(skip).limit(limit).all()
+    selected = parse_fields(fields, schemas.Company)
 
-@router.get("/{company_id}", response_model=schemas.Company)
-def read_company(company_id: int, db: Session = Depends(get_db)):
-    db_company = db.query(models.Company).filter(models.Company.id == company_id).first()
+    def load():
+        query = db.query(models.Company).options(load_columns(models.Company, selected))
+        if industry:
+            query = query.filter(models.Company.industry == industry)
+        rows = project(query.offset(skip).limit(limit).all(), schemas.Company, selected)
+        return [row.model_dump(mode="json") for row in rows]
+
+    return query_cache.get_or_load(
+        "read_companies",
+        {"skip": skip, "limit": limit, "industry": industry, "fields": selected},
+        ["Company", table_epoch("Company")],
+        load,
+        min_age=replica_lag_window(db)
+    )
+
+@router.get("/{company_id}", response_model=partial_schema(schemas.Company), response_model_exclude_unset=True)
+def read_company(
+    company_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    db: Session = Depends(get_db)
+):
+    selected = parse_fields(fields, schemas.Company)
+    db_company = (
+        db.query(models.Company)
+        .options(load_columns(models.Company, selected))
+        .filter(models.Company.id == company_id)
+        .first()
+    )
     if db_company is None:
         raise HTTPException(status_code=404, detail="Company not found")
-    return db_company
+    return project([db_company], schemas.Company, selected)[0]
 
 @router.put("/{company_id}", response_model=schemas.Company)
 def update_company(
@@ -45,10 +73,13 @@ def update_company(
     if db_company is None:
         raise HTTPException(status_code=404, detail="Company not found")
     
+    previous_industry = db_company.industry
     for key, value in company.dict(exclude_unset=True).items():
         setattr(db_company, key, value)
     
+    facets.company_industry_changed(db, company_id, previous_industry, db_company.industry)
     db.commit()
+    query_cache.invalidate("Company")
     db.refresh(db_company)
     return db_company
 
@@ -58,6 +89,8 @@ def delete_company(company_id: int, db: Session = Depends(get_db)):
     if db_company is None:
         raise HTTPException(status_code=404, detail="Company not found")
     
+    facets.company_industry_changed(db, company_id, db_company.industry, None)
     db.delete(db_company)
     db.commit()
+    query_cache.invalidate("Company")
     return {"message": "Company deleted successfully"} 
\ No newline at end of file
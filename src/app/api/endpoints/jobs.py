@@ -1,57 +1,223 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from app.db.session import get_db
+from app.core.config import settings
+from app.db.session import get_db, replica_lag_window
 from app.models import models
 from app.schemas import schemas
 from app.crud import crud
 from app.services.openai_service import generate_job_description, stream_job_description
+from app.services.streaming import ChunkBatcher, SSE_HEADERS, sse_event
+from app.services.job_descriptions import normalize_skills, rendered_description
+from app.services import archival, dedup, facets, skills
+from app.services.change_feed import change_feed
+from app.services.query_cache import job_posting_counters, job_postings_for_company, query_cache, table_epoch
+from app.api.projection import column_names, load_columns, parse_fields, partial_schema, project
+from app.api.profiling import ProfiledRoute
 from fastapi.responses import StreamingResponse
+from sqlalchemy import String, cast, select, type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+import json
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# Large generated text is left out of listings unless asked for with ?fields=
+LISTING_FIELDS = [
+    name for name in schemas.JobPosting.model_fields
+    if name not in ("description", "description_data")
+]
+# Columns needed to produce each response field that isn't a plain column
+FIELD_COLUMNS = {
+    "description": ("description", "description_data", "description_version", "updated_at"),
+}
+
+
+def required_skill_filter(db: Session, skill: str, column=models.JobPosting.required_skills):
+    skills = normalize_skills([skill]) or [skill]
+    if db.get_bind().dialect.name == "postgresql":
+        # JSONB containment, served by the GIN index on required_skills
+        return type_coerce(column, JSONB).contains(skills)
+    # Other backends store the list as JSON text
+    return cast(column, String).like(f"%{json.dumps(skills[0])}%")
+
+
+def render_archived(row: Dict) -> Dict:
+    """
+    Archived rows come back as plain mappings; render their description like
+    JobPosting.rendered_description does.
+    """
+    row = dict(row)
+    if "description" in row:
+        row["description"] = rendered_description(
+            row["id"], row["description"], row.get("description_data"),
+            row.get("description_version"), row.get("updated_at")
+        )
+    return row
+
+
+def save_description(db: Session, job: models.JobPosting, description: str):
+    """
+    Store a generated description and announce it. Blocking; async handlers
+    run it in the threadpool.
+    """
+    job.description = description
+    dedup.index_posting(db, job)
+    db.commit()
+    query_cache.invalidate(*job_posting_counters(job.company_id))
+    change_feed.publish("job", "updated", job_id=job.id, company_id=job.company_id)
 
 
 @router.post("/", response_model=schemas.JobPosting)
-def create_job_posting(job: schemas.JobPostingCreate, db: Session = Depends(get_db)):
+def create_job_posting(
+    job: schemas.JobPostingCreate,
+    on_duplicate: str = Query(
+        settings.DEDUP_ON_INSERT,
+        pattern="^(allow|reject|merge)$",
+        description="What to do when a near-duplicate posting already exists"
+    ),
+    db: Session = Depends(get_db)
+):
     # Verify company exists
     company = db.query(models.Company).filter(models.Company.id == job.company_id).first()
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
     
     db_job = models.JobPosting(**job.dict())
+
+    if on_duplicate != "allow":
+        matches = dedup.find_similar(db, dedup.signature_for(db_job), db_job.company_id, limit=1)
+        if matches:
+            duplicate_id, score = matches[0]
+            if on_duplicate == "reject":
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Near-duplicate of job posting {duplicate_id} (similarity {score:.2f})"
+                )
+            # Merge: keep the existing posting and fill in anything it is missing
+            existing = db.query(models.JobPosting).filter(models.JobPosting.id == duplicate_id).first()
+            before = facets.job_snapshot(db, existing)
+            for key, value in job.dict(exclude_unset=True).items():
+                if value is not None and getattr(existing, key) is None:
+                    setattr(existing, key, value)
+            facets.apply(db, before, facets.job_snapshot(db, existing))
+            dedup.index_posting(db, existing)
+            db.commit()
+            query_cache.invalidate(*job_posting_counters(existing.company_id))
+            change_feed.publish("job", "updated", job_id=existing.id, company_id=existing.company_id)
+            db.refresh(existing)
+            return existing
+
     db.add(db_job)
+    db.flush()
+    dedup.index_posting(db, db_job)
+    facets.apply(db, after=facets.job_values(db_job, company.industry))
     db.commit()
+    query_cache.invalidate(*job_posting_counters(db_job.company_id))
+    change_feed.publish("job", "created", job_id=db_job.id, company_id=db_job.company_id)
     db.refresh(db_job)
     return db_job
 
-@router.get("/", response_model=List[schemas.JobPosting])
+@router.get("/", response_model=List[partial_schema(schemas.JobPosting)], response_model_exclude_unset=True)
 def read_job_postings(
     skip: int = 0,
     limit: int = 100,
     company_id: Optional[int] = None,
     title: Optional[str] = None,
     location: Optional[str] = None,
+    skill: Optional[str] = Query(None, description="Only postings that require this skill"),
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    include_archived: bool = Query(False, description="Also return archived postings"),
     db: Session = Depends(get_db)
 ):
-    query = db.query(models.JobPosting)
-    
-    if company_id:
-        query = query.filter(models.JobPosting.company_id == company_id)
-    if title:
-        query = query.filter(models.JobPosting.title.ilike(f"%{title}%"))
-    if location:
-        query = query.filter(models.JobPosting.location.ilike(f"%{location}%"))
-    
-    return query.offset(skip).limit(limit).all()
+    selected = parse_fields(fields, schemas.JobPosting, default=LISTING_FIELDS)
+
+    # Takes a table's columns so the same filters apply to the archive table
+    def where(c):
+        clauses = []
+        if company_id:
+            clauses.append(c.company_id == company_id)
+        if title:
+            clauses.append(c.title.ilike(f"%{title}%"))
+        if location:
+            clauses.append(c.location.ilike(f"%{location}%"))
+        if skill:
+            clauses.append(required_skill_filter(db, skill, c.required_skills))
+        return clauses
+
+    if include_archived:
+        rows = archival.read_with_archive(
+            db, models.JobPosting, models.JobPostingArchive,
+            column_names(selected, FIELD_COLUMNS), where, skip, limit
+        )
+        return project([render_archived(row) for row in rows], schemas.JobPosting, selected)
+
+    def load():
+        query = (
+            db.query(models.JobPosting)
+            .options(load_columns(models.JobPosting, selected, FIELD_COLUMNS))
+            .filter(*where(models.JobPosting.__table__.c))
+        )
+        rows = project(query.offset(skip).limit(limit).all(), schemas.JobPosting, selected)
+        return [row.model_dump(mode="json") for row in rows]
+
+    # Listings for one company only depend on that company's postings
+    counter = job_postings_for_company(company_id) if company_id else "JobPosting"
+    return query_cache.get_or_load(
+        "read_job_postings",
+        {
+            "skip": skip, "limit": limit, "company_id": company_id, "title": title,
+            "location": location, "skill": skill, "fields": selected
+        },
+        [counter, table_epoch("JobPosting")],
+        load,
+        min_age=replica_lag_window(db)
+    )
+
+@router.get("/facets", response_model=Dict[str, List[schemas.FacetValue]])
+def read_job_facets(
+    facet: List[str] = Query(list(facets.JOB_FACETS), description="Facets to count"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Posting counts by location, company and industry.
+    """
+    unknown = set(facet) - set(facets.JOB_FACETS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown facets: {', '.join(sorted(unknown))}")
+
+    result = facets.read(db, facet, "job", limit=limit)
+    if "company" in result:
+        ids = [int(item["value"]) for item in result["company"] if item["value"]]
+        names = dict(db.query(models.Company.id, models.Company.name).filter(models.Company.id.in_(ids))) if ids else {}
+        for item in result["company"]:
+            item["label"] = names.get(int(item["value"])) if item["value"] else None
+    return result
 
 #jobs/6
-@router.get("/{job_id}", response_model=schemas.JobPosting)
-def read_job_posting(job_id: int, db: Session = Depends(get_db)):
-    db_job = db.query(models.JobPosting).filter(models.JobPosting.id == job_id).first()
+@router.get("/{job_id}", response_model=partial_schema(schemas.JobPosting), response_model_exclude_unset=True)
+def read_job_posting(
+    job_id: int,
+    fields: Optional[str] = Query(None, description="Comma-separated list of fields to return"),
+    include_archived: bool = Query(False, description="Also look in archived postings"),
+    db: Session = Depends(get_db)
+):
+    selected = parse_fields(fields, schemas.JobPosting)
+    db_job = (
+        db.query(models.JobPosting)
+        .options(load_columns(models.JobPosting, selected, FIELD_COLUMNS))
+        .filter(models.JobPosting.id == job_id)
+        .first()
+    )
+    if db_job is None and include_archived:
+        archive = models.JobPostingArchive
+        row = db.execute(select(archive).where(archive.c.id == job_id)).mappings().first()
+        db_job = render_archived(row) if row is not None else None
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job posting not found")
-    return db_job
+    return project([db_job], schemas.JobPosting, selected)[0]
 
 @router.put("/{job_id}", response_model=schemas.JobPosting)
 def update_job_posting(
@@ -63,6 +229,9 @@ def update_job_posting(
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job posting not found")
     
+    previous_company_id = db_job.company_id
+    before = facets.job_snapshot(db, db_job)
+
     # If company_id is being updated, verify the new company exists
     if job.company_id and job.company_id != db_job.company_id:
         company = db.query(models.Company).filter(models.Company.id == job.company_id).first()
@@ -72,7 +241,11 @@ def update_job_posting(
     for key, value in job.dict(exclude_unset=True).items():
         setattr(db_job, key, value)
     
+    dedup.index_posting(db, db_job)
+    facets.apply(db, before, facets.job_snapshot(db, db_job))
     db.commit()
+    query_cache.invalidate(*job_posting_counters(previous_company_id, db_job.company_id))
+    change_feed.publish("job", "updated", job_id=db_job.id, company_id=db_job.company_id)
     db.refresh(db_job)
     return db_job
 
@@ -82,10 +255,79 @@ def delete_job_posting(job_id: int, db: Session = Depends(get_db)):
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job posting not found")
     
+    company_id = db_job.company_id
+    facets.apply(db, before=facets.job_snapshot(db, db_job))
+    dedup.remove_posting(db, job_id)
     db.delete(db_job)
     db.commit()
+    query_cache.invalidate(*job_posting_counters(company_id))
+    change_feed.publish("job", "deleted", job_id=job_id, company_id=company_id)
     return {"message": "Job posting deleted successfully"}
 
+@router.get("/{job_id}/duplicates", response_model=List[schemas.DuplicateMatch])
+def read_job_duplicates(
+    job_id: int,
+    threshold: float = Query(settings.DEDUP_THRESHOLD, ge=0, le=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Near-duplicates of a posting, most similar first.
+    """
+    if db.query(models.JobPosting.id).filter(models.JobPosting.id == job_id).first() is None:
+        raise HTTPException(status_code=404, detail="Job posting not found")
+    matches = dedup.find_duplicates(db, job_id, threshold=threshold, limit=limit)
+    return [schemas.DuplicateMatch(job_id=match_id, similarity=score) for match_id, score in matches]
+
+@router.get("/{job_id}/candidates/ranked", response_model=List[schemas.RankedCandidate])
+def read_ranked_candidates(
+    job_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    Applicants to a posting, ranked by how many of its required skills their
+    resume covers.
+    """
+    db_job = db.query(models.JobPosting).filter(models.JobPosting.id == job_id).first()
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job posting not found")
+
+    required = skills.job_skills(db_job)
+    # Skills no resume has mentioned yet have no id and can't match
+    names_by_id = {
+        skill_id: name for name, skill_id in
+        db.query(models.Skill.name, models.Skill.id).filter(models.Skill.name.in_(required))
+    }
+    mask = 0
+    for skill_id in names_by_id:
+        mask |= 1 << skill_id
+
+    applicants = {
+        row.id: row for row in db.query(
+            models.Application.id, models.Application.candidate_id, models.Application.name,
+            models.Application.email, models.Application.status, models.Application.skill_bits
+        ).filter(models.Application.job_id == job_id)
+    }
+    ranked = skills.rank([(row.id, row.skill_bits) for row in applicants.values()], mask, limit)
+
+    candidates = []
+    for application_id, matched, count in ranked:
+        row = applicants[application_id]
+        matched_skills = skills.names_in(matched, names_by_id)
+        candidates.append(schemas.RankedCandidate(
+            application_id=application_id,
+            candidate_id=row.candidate_id,
+            name=row.name,
+            email=row.email,
+            status=row.status,
+            score=count / len(required) if required else 0.0,
+            matched_skills=matched_skills,
+            missing_skills=[name for name in required if name not in matched_skills],
+            has_resume=row.skill_bits is not None
+        ))
+    return candidates
+
 @router.post("/{job_id}/description", response_model=schemas.JobDescriptionResponse)
 async def generate_job_description_endpoint(
     job_id: int = Path(..., description="The ID of the job posting"),
@@ -112,9 +354,8 @@ async def generate_job_description_endpoint(
     )
 
     # Update job posting with new description
-    job.description = description
-    db.commit()
-    db.refresh(job)
+    await run_in_threadpool(save_description, db, job, description)
+    await run_in_threadpool(db.refresh, job)
 
     return schemas.JobDescriptionResponse(
         job_id=job.id,
@@ -142,20 +383,23 @@ async def stream_job_description_endpoint(
         raise HTTPException(status_code=404, detail="Company not found")
 
     async def generate():
-        full_description = ""
-        async for chunk in stream_job_description(
-            job_title=job.title,
-            company_name=company.name,
-            required_tools=request.required_tools
-        ):
-            full_description += chunk
-            yield chunk
-
-        # Update job posting with the complete description
-        job.description = full_description
-        db.commit()
+        batcher = ChunkBatcher()
+        try:
+            async for frame in batcher.frames(stream_job_description(
+                job_title=job.title,
+                company_name=company.name,
+                required_tools=request.required_tools
+            )):
+                yield frame
+        except Exception as e:
+            yield sse_event({"error": str(e)})
+            return
+
+        # Update job posting with the complete description, off the event loop
+        await run_in_threadpool(save_description, db, job, batcher.text)
 
     return StreamingResponse(
         generate(),
-        media_type="text/event-stream"
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
     ) 
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+Opt-in request profiling.
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>` or when
+PROFILE_SAMPLE_RATE selects it at random. Profiled requests run under
+pyinstrument's sampling profiler; each one is saved to PROFILE_DIR as a
+speedscope file (open at https://www.speedscope.app) or a flamegraph-style
+HTML page, and the PROFILE_SLOWEST_PER_ROUTE slowest profiled requests of
+every route are kept in PROFILE_DIR/summary-<pid>.json.
+
+pyinstrument only samples the thread it was started on, and FastAPI runs
+sync handlers in its threadpool, so routers use ProfiledRoute: during a
+profiled request it runs the handler in the threadpool under a second
+profiler and the two sessions are merged into one profile.
+
+With no token and a zero sample rate the middleware is not installed at all,
+and pyinstrument is only imported when it is. Print the summary of every
+worker with `python -m app.api.profiling`.
+"""
+import functools
+import heapq
+import hmac
+import inspect
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+EXTENSIONS = {"speedscope": "speedscope.json", "html": "html"}
+
+# Sessions recorded in threadpool workers for the request being profiled
+_thread_sessions: ContextVar[Optional[List]] = ContextVar("profile_thread_sessions", default=None)
+
+
+def enabled() -> bool:
+    return bool(settings.PROFILE_TOKEN) or settings.PROFILE_SAMPLE_RATE > 0
+
+
+def _run_profiled(endpoint, sessions: List, args, kwargs):
+    from pyinstrument import Profiler
+
+    profiler = Profiler(interval=settings.PROFILE_INTERVAL_MS / 1000, async_mode="disabled")
+    profiler.start()
+    try:
+        return endpoint(*args, **kwargs)
+    finally:
+        sessions.append(profiler.stop())
+
+
+def _threadpool_profiled(endpoint):
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        sessions = _thread_sessions.get()
+        if sessions is None:
+            return await run_in_threadpool(endpoint, *args, **kwargs)
+        return await run_in_threadpool(_run_profiled, endpoint, sessions, args, kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose sync handlers are profiled on the threadpool thread they
+    run on. A plain APIRoute unless profiling is configured.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        # Already wrapped endpoints are coroutines, so include_router doesn't wrap twice
+        if enabled() and not inspect.iscoroutinefunction(endpoint):
+            endpoint = _threadpool_profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _route_name(scope) -> str:
+    route = scope.get("route")
+    path = scope["path"]
+    if getattr(route, "path_regex", None) is None:
+        return f"{scope['method']} {path}"
+    # Depending on the FastAPI version, routes of included routers carry the
+    # full path or only the part after the prefix
+    for start in [0] + [i for i, char in enumerate(path) if char == "/" and i]:
+        if route.path_regex.match(path[start:]):
+            return f"{scope['method']} {path[:start]}{route.path}"
+    return f"{scope['method']} {route.path}"
+
+
+class ProfilingMiddleware:
+    def __init__(
+        self,
+        app,
+        directory: str,
+        token: str = "",
+        sample_rate: float = 0.0,
+        interval_ms: float = 1.0,
+        output_format: str = "speedscope",
+        slowest_per_route: int = 20
+    ):
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+        from pyinstrument.session import Session
+
+        self.app = app
+        self.directory = directory
+        self.token = token.encode("utf-8")
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        self.output_format = output_format
+        self.slowest_per_route = slowest_per_route
+        self.profiler_class = Profiler
+        self.combine = Session.combine
+        self.renderer_class = SpeedscopeRenderer if output_format == "speedscope" else HTMLRenderer
+        # route -> min-heap of (duration_ms, entry), so the fastest is evicted first
+        self.slowest: Dict[str, List[Tuple[float, int, Dict]]] = {}
+        self.saved = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _selected(self, scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER:
+                    return hmac.compare_digest(value, self.token)
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        profiler = self.profiler_class(interval=self.interval, async_mode="enabled")
+        thread_sessions = []
+        reset_token = _thread_sessions.set(thread_sessions)
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            session = profiler.stop()
+            duration_ms = (time.perf_counter() - started) * 1000
+            _thread_sessions.reset(reset_token)
+            for thread_session in thread_sessions:
+                session = self.combine(session, thread_session)
+            try:
+                await run_in_threadpool(self._save, scope, session, status["code"], duration_ms)
+            except Exception:
+                logger.exception("Saving request profile failed")
+
+    def _save(self, scope, session, status: int, duration_ms: float):
+        route = _route_name(scope)
+        now = datetime.now(timezone.utc)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_")
+        filename = f"{now:%Y%m%dT%H%M%S%f}-{slug}-{duration_ms:.0f}ms.{EXTENSIONS[self.output_format]}"
+        with open(os.path.join(self.directory, filename), "w", encoding="utf-8") as f:
+            f.write(self.renderer_class().render(session))
+
+        entry = {
+            "duration_ms": round(duration_ms, 2),
+            "status": status,
+            "path": scope["path"],
+            "at": now.isoformat(),
+            "profile": filename,
+        }
+        with self.lock:
+            self.saved += 1
+            heap = self.slowest.setdefault(route, [])
+            item = (duration_ms, self.saved, entry)
+            if len(heap) < self.slowest_per_route:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+            summary = {
+                name: [entry for _, _, entry in sorted(items, reverse=True)]
+                for name, items in sorted(self.slowest.items())
+            }
+            tmp_path = os.path.join(self.directory, f"summary-{os.getpid()}.json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            os.replace(tmp_path, os.path.join(self.directory, f"summary-{os.getpid()}.json"))
+
+
+def add_profiling(app):
+    """
+    Install ProfilingMiddleware on `app` if profiling is configured.
+    """
+    if not enabled():
+        return
+    try:
+        import pyinstrument  # noqa: F401
+    except ImportError:
+        logger.warning("Request profiling is configured but pyinstrument is not installed")
+        return
+    if settings.PROFILE_FORMAT not in EXTENSIONS:
+        raise ValueError(f"PROFILE_FORMAT must be one of {', '.join(EXTENSIONS)}")
+    # For routes declared on the app itself; routers pass route_class=ProfiledRoute
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(
+        ProfilingMiddleware,
+        directory=settings.PROFILE_DIR,
+        token=settings.PROFILE_TOKEN,
+        sample_rate=settings.PROFILE_SAMPLE_RATE,
+        interval_ms=settings.PROFILE_INTERVAL_MS,
+        output_format=settings.PROFILE_FORMAT,
+        slowest_per_route=settings.PROFILE_SLOWEST_PER_ROUTE
+    )
+
+
+def merged_summary(directory: str, limit: int) -> Dict[str, List[Dict]]:
+    merged: Dict[str, List[Dict]] = {}
+    for name in os.listdir(directory):
+        if name.startswith("summary-") and name.endswith(".json"):
+            with open(os.path.join(directory, name), encoding="utf-8") as f:
+                for route, entries in json.load(f).items():
+                    merged.setdefault(route, []).extend(entries)
+    return {
+        route: sorted(entries, key=lambda entry: entry["duration_ms"], reverse=True)[:limit]
+        for route, entries in merged.items()
+    }
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else settings.PROFILE_DIR
+    summary = merged_summary(directory, settings.PROFILE_SLOWEST_PER_ROUTE)
+    for route, entries in sorted(summary.items(), key=lambda item: -item[1][0]["duration_ms"]):
+        print(f"{route}  ({len(entries)} slowest)")
+        for entry in entries:
+            print(f"  {entry['duration_ms']:10.1f}ms  {entry['status']}  {entry['path']}  {entry['profile']}")
@@ -0,0 +1,83 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, create_model
+from sqlalchemy.orm import load_only
+
+
+def parse_fields(
+    fields: Optional[str],
+    schema: Type[BaseModel],
+    default: Optional[Sequence[str]] = None
+) -> Tuple[str, ...]:
+    """
+    Resolve a ?fields= value against a response schema.
+
+    Returns the selected field names in schema order; `id` is always included.
+    """
+    if fields:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        unknown = [name for name in names if name not in schema.model_fields]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        names = default or list(schema.model_fields)
+
+    wanted = set(names) | {"id"}
+    return tuple(name for name in schema.model_fields if name in wanted)
+
+
+def column_names(fields: Iterable[str], dependencies: Optional[Dict[str, Sequence[str]]] = None) -> List[str]:
+    """
+    Columns to fetch for the selected fields.
+
+    `dependencies` maps a response field to the columns needed to compute it.
+    """
+    columns = []
+    for name in fields:
+        for column in (dependencies or {}).get(name, (name,)):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def load_columns(model: Any, fields: Iterable[str], dependencies: Optional[Dict[str, Sequence[str]]] = None):
+    """
+    Build a load_only() option so unselected columns are never fetched.
+    """
+    return load_only(*(getattr(model, column) for column in column_names(fields, dependencies)))
+
+
+@lru_cache(maxsize=None)
+def projected_schema(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    A reduced copy of `schema` that only reads the selected fields.
+    """
+    definitions = {
+        name: (schema.model_fields[name].annotation, schema.model_fields[name])
+        for name in fields
+    }
+    return create_model(
+        f"{schema.__name__}Projection",
+        __config__=ConfigDict(from_attributes=True),
+        **definitions
+    )
+
+
+@lru_cache(maxsize=None)
+def partial_schema(schema: Type[BaseModel]) -> Type[BaseModel]:
+    """
+    Response model for projected endpoints: every field optional, and unset
+    fields are dropped with response_model_exclude_unset=True.
+    """
+    definitions = {
+        name: (Optional[field.annotation], None)
+        for name, field in schema.model_fields.items()
+    }
+    return create_model(f"{schema.__name__}Partial", **definitions)
+
+
+def project(rows: Iterable[Any], schema: Type[BaseModel], fields: Tuple[str, ...]) -> List[BaseModel]:
+    projection = projected_schema(schema, fields)
+    return [projection.model_validate(row) for row in rows]
@@ -0,0 +1,37 @@
+"""
+Read-your-writes for replica routing.
+
+A successful write response sets the PRIMARY_COOKIE for
+REPLICA_STICKY_SECONDS, and get_db keeps reads that carry it on the
+primary, so a client sees its own writes even while the replicas are still
+replaying them. Only installed when DATABASE_REPLICA_URLS is set.
+"""
+from app.core.config import settings
+from app.db.session import PRIMARY_COOKIE, READ_METHODS, replicas
+
+SAFE_METHODS = READ_METHODS + ("OPTIONS",)
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app, sticky_seconds: int):
+        self.app = app
+        self.cookie = (
+            f"{PRIMARY_COOKIE}=1; Max-Age={sticky_seconds}; Path=/; HttpOnly; SameSite=Lax"
+        ).encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", self.cookie)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def add_read_your_writes(app):
+    if replicas is not None and settings.REPLICA_STICKY_SECONDS > 0:
+        app.add_middleware(ReadYourWritesMiddleware, sticky_seconds=settings.REPLICA_STICKY_SECONDS)
@@ -8,6 +8,14 @@ load_dotenv()
 class Settings(BaseSettings):
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    # Comma-separated read replicas; GET requests read from them and
+    # everything else goes to DATABASE_URL
+    DATABASE_REPLICA_URLS: str = ""
+    # After a write, the client's reads stay on the primary this long
+    REPLICA_STICKY_SECONDS: int = 5
+    # Replicas lagging more than this are skipped until they catch up
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_HEALTH_CHECK_SECONDS: float = 5.0
     
     # Application settings
     PROJECT_NAME: str = "AI Job Matching API"
@@ -17,6 +25,94 @@ class Settings(BaseSettings):
     # OpenAI settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
 
+    # Streaming settings - model chunks are coalesced into one SSE frame until
+    # either threshold is reached
+    STREAM_FLUSH_BYTES: int = 512
+    STREAM_FLUSH_INTERVAL_MS: float = 15.0
+
+    # Near-duplicate detection - DEDUP_NUM_PERM must be divisible by DEDUP_BANDS,
+    # and changing either (or DEDUP_MIN_SHINGLES) requires
+    # `python -m app.services.dedup reindex`
+    DEDUP_NUM_PERM: int = 128
+    DEDUP_BANDS: int = 16
+    DEDUP_SHINGLE_SIZE: int = 3
+    DEDUP_THRESHOLD: float = 0.8
+    # Postings with fewer shingles (e.g. title only) are not deduplicated
+    DEDUP_MIN_SHINGLES: int = 20
+    # Most postings one LSH bucket contributes to a lookup
+    DEDUP_MAX_BUCKET_CANDIDATES: int = 200
+    # What POST /jobs does with a near-duplicate: "allow", "reject" or "merge"
+    DEDUP_ON_INSERT: str = "allow"
+
+    # Read-through cache for hot list queries: "sqlite" (shared by every worker
+    # on the host), "memory" (single worker only) or "none"
+    QUERY_CACHE_BACKEND: str = "sqlite"
+    QUERY_CACHE_PATH: str = ""  # defaults to a per-DATABASE_URL file in the system temp dir
+    QUERY_CACHE_MAX_ENTRIES: int = 2048
+
+    # Facet counts - each value's count is split over this many rows so
+    # concurrent writes of the same value don't queue on one row lock
+    FACET_COUNTER_SHARDS: int = 16
+    # How often the shards are folded back into one row per value (0 = off)
+    FACET_ROLLUP_INTERVAL_SECONDS: float = 60.0
+
+    # Write-behind ingestion for POST /applications: submissions are logged to
+    # WRITE_BEHIND_DIR and inserted in batches by a background thread
+    APPLICATION_WRITE_BEHIND: bool = False
+    WRITE_BEHIND_DIR: str = ".write_behind"
+    WRITE_BEHIND_BATCH_SIZE: int = 500
+    WRITE_BEHIND_FLUSH_INTERVAL_MS: float = 200.0
+    WRITE_BEHIND_FSYNC: bool = True
+
+    # Archival - closed applications and old postings are moved to the
+    # *Archive tables by a background job every ARCHIVE_INTERVAL_MINUTES (0 = off)
+    ARCHIVE_INTERVAL_MINUTES: int = 0
+    ARCHIVE_BATCH_SIZE: int = 1000
+    ARCHIVE_APPLICATIONS_AFTER_DAYS: int = 180
+    # Comma-separated; empty archives applications in any status
+    ARCHIVE_APPLICATION_STATUSES: str = "Rejected,Hired,Withdrawn,Closed"
+    # Postings are only archived once none of their applications are left
+    ARCHIVE_JOBS_AFTER_DAYS: int = 365
+
+    # Change feed (GET /api/v1/changes): "memory" serves one worker, "postgres"
+    # shares events between workers through LISTEN/NOTIFY
+    CHANGE_FEED_BACKEND: str = "memory"
+    # Events kept for clients resuming with Last-Event-ID
+    CHANGE_FEED_BUFFER_SIZE: int = 10000
+    # Events a slow subscriber may fall behind before it is sent a reset
+    CHANGE_FEED_MAX_QUEUED: int = 1000
+    CHANGE_FEED_KEEPALIVE_SECONDS: float = 15.0
+
+    # Resume skill extraction - SKILL_DICTIONARY_PATH is an optional JSON file
+    # of {"skill": ["alias", ...]} added to the built-in dictionary, and
+    # RESUME_SKILL_MODEL (e.g. "gpt-4o-mini") adds a model pass when set
+    SKILL_DICTIONARY_PATH: str = ""
+    RESUME_SKILL_MODEL: str = ""
+    RESUME_WORKERS: int = 0  # process pool size, 0 = one per CPU
+
+    # Request profiling (needs pyinstrument) - a request is profiled when it
+    # sends `X-Profile: <PROFILE_TOKEN>` or PROFILE_SAMPLE_RATE picks it.
+    # With no token and a zero rate the middleware is not installed.
+    PROFILE_TOKEN: str = ""
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_DIR: str = ".profiles"
+    PROFILE_INTERVAL_MS: float = 1.0
+    # "speedscope" or "html"
+    PROFILE_FORMAT: str = "speedscope"
+    PROFILE_SLOWEST_PER_ROUTE: int = 20
+
+    # Response compression - the first of COMPRESSION_ENCODINGS the client
+    # accepts is used (br needs brotli, zstd needs zstandard). Levels were
+    # picked with benchmarks/bench_compression.py.
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_ENCODINGS: str = "zstd,br,gzip"
+    # Buffered responses smaller than this are sent as they are; streams
+    # are always compressed
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 4
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
     class Config:
         env_file = ".env"
         case_sensitive = True
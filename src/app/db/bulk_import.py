@@ -0,0 +1,311 @@
+"""
+Bulk import companies, job postings and applications from CSV or JSONL.
+
+    python -m app.db.bulk_import companies data/companies.csv
+    python -m app.db.bulk_import jobs data/jobs.jsonl
+    python -m app.db.bulk_import applications data/applications.csv
+
+Rows are streamed from the file and validated in batches with the
+schemas.*Create models. Each batch is loaded with COPY on Postgres or a
+batched executemany elsewhere. The number of committed source rows is
+stored in ImportCheckpoint in the same transaction, so an interrupted
+import resumes where it stopped when it is run again.
+
+If source rows have an `id`, the ids given to companies and jobs are
+written to <state-dir>/<kind>.ids. Later imports use that map to resolve
+jobs.company_id and applications.job_id.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal, init_db
+from app.models import models
+from app.schemas import schemas
+from app.services import facets
+from app.services.query_cache import query_cache, table_epoch
+
+# kind -> (model, create schema, foreign key column, kind the key refers to)
+KINDS = {
+    "companies": (models.Company, schemas.CompanyCreate, None, None),
+    "jobs": (models.JobPosting, schemas.JobPostingCreate, "company_id", "companies"),
+    "applications": (models.Application, schemas.ApplicationCreate, "job_id", "jobs"),
+}
+# Kinds other imports refer to, which need their ids allocated up front
+MAPPED_KINDS = ("companies", "jobs")
+
+COPY_NULL = "\\N"
+
+
+def read_rows(path: str, fmt: Optional[str] = None) -> Iterator[Dict]:
+    fmt = fmt or ("csv" if path.endswith(".csv") else "jsonl")
+    with open(path, newline="" if fmt == "csv" else None, encoding="utf-8") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield {key: (value if value != "" else None) for key, value in row.items()}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class IdMap:
+    """
+    Source id -> database id for one kind, kept in memory and appended to
+    <state-dir>/<kind>.ids as batches are loaded.
+    """
+
+    def __init__(self, state_dir: str, kind: str):
+        self.path = os.path.join(state_dir, f"{kind}.ids")
+        self.ids: Dict[str, int] = {}
+        self.entries = 0
+
+    def load(self, limit: Optional[int] = None):
+        """
+        Read the map. With `limit`, the file is truncated to its first
+        `limit` entries.
+        """
+        if not os.path.exists(self.path):
+            return self
+        kept = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if limit is not None and len(kept) >= limit:
+                    break
+                source_id, target_id = line.rstrip("\n").rsplit(",", 1)
+                self.ids[source_id] = int(target_id)
+                kept.append(line)
+        self.entries = len(kept)
+        if limit is not None:
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.writelines(kept)
+        return self
+
+    def append(self, pairs: List[Tuple[str, int]]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(f"{source_id},{target_id}\n" for source_id, target_id in pairs)
+            f.flush()
+            os.fsync(f.fileno())
+        self.ids.update(pairs)
+        self.entries += len(pairs)
+
+
+def allocate_ids(db: Session, model, count: int) -> List[int]:
+    table = model.__tablename__
+    if db.get_bind().dialect.name == "postgresql":
+        result = db.execute(
+            text(f"SELECT nextval(pg_get_serial_sequence('\"{table}\"', 'id')) FROM generate_series(1, :n)"),
+            {"n": count}
+        )
+        return [row[0] for row in result]
+    # Single writer outside Postgres, so continuing from max(id) is safe
+    start = db.query(func.coalesce(func.max(model.id), 0)).scalar()
+    return list(range(start + 1, start + count + 1))
+
+
+def copy_rows(db: Session, model, columns: List[str], rows: List[Dict]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([COPY_NULL if row.get(column) is None else row[column] for column in columns])
+    buffer.seek(0)
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f'COPY "{model.__tablename__}" ({column_list}) FROM STDIN WITH (FORMAT csv, NULL \'{COPY_NULL}\')',
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def load_rows(db: Session, model, columns: List[str], rows: List[Dict]):
+    if db.get_bind().dialect.name == "postgresql":
+        copy_rows(db, model, columns, rows)
+    else:
+        db.execute(insert(model.__table__), [{column: row.get(column) for column in columns} for row in rows])
+
+
+def existing_applications(db: Session, items: List[Dict]) -> set:
+    pairs = list({(item["candidate_id"], item["job_id"]) for item in items})
+    return set(
+        db.query(models.Application.candidate_id, models.Application.job_id)
+        .filter(tuple_(models.Application.candidate_id, models.Application.job_id).in_(pairs))
+    )
+
+
+def save_checkpoint(db: Session, name: str, rows_done: int):
+    checkpoint = db.query(models.ImportCheckpoint).filter(models.ImportCheckpoint.name == name).first()
+    if checkpoint is None:
+        db.add(models.ImportCheckpoint(name=name, rows_done=rows_done))
+    else:
+        checkpoint.rows_done = rows_done
+
+
+def load_id_map(db: Session, state_dir: str, kind: str) -> IdMap:
+    # Entries past the committed count were written by a batch that was rolled back
+    checkpoint = db.query(models.ImportCheckpoint).filter(models.ImportCheckpoint.name == f"ids:{kind}").first()
+    return IdMap(state_dir, kind).load(limit=checkpoint.rows_done if checkpoint else 0)
+
+
+def import_file(
+    db: Session,
+    kind: str,
+    path: str,
+    fmt: Optional[str] = None,
+    batch_size: int = 5000,
+    state_dir: str = ".import_state",
+    keep_fks: bool = False,
+    rejects_path: Optional[str] = None
+) -> Tuple[int, int]:
+    model, schema, fk_column, fk_kind = KINDS[kind]
+    os.makedirs(state_dir, exist_ok=True)
+    checkpoint_name = f"{kind}:{os.path.abspath(path)}"
+    checkpoint = db.query(models.ImportCheckpoint).filter(models.ImportCheckpoint.name == checkpoint_name).first()
+    rows_done = checkpoint.rows_done if checkpoint else 0
+
+    id_map = load_id_map(db, state_dir, kind) if kind in MAPPED_KINDS else None
+    fk_map = load_id_map(db, state_dir, fk_kind) if fk_kind and not keep_fks else None
+
+    columns = list(schema.model_fields)
+    rejects = open(rejects_path or os.path.join(state_dir, f"{kind}.rejects.jsonl"), "a", encoding="utf-8")
+
+    loaded = rejected = 0
+    started = time.monotonic()
+    rows = read_rows(path, fmt)
+
+    if rows_done:
+        print(f"Resuming {path} after {rows_done} rows", file=sys.stderr)
+        for _ in zip(range(rows_done), rows):
+            pass
+
+    def flush(batch: List[Tuple[int, Dict]], position: int):
+        nonlocal loaded, rejected
+        valid = []
+        for line_no, raw in batch:
+            try:
+                # Blank cells and nulls fall back to the *Create schema defaults
+                row = {key: value for key, value in raw.items() if value is not None}
+                if fk_map is not None:
+                    source_fk = str(raw.get(fk_column))
+                    if source_fk not in fk_map.ids:
+                        raise ValueError(f"unknown {fk_column} {source_fk}")
+                    row[fk_column] = fk_map.ids[source_fk]
+                valid.append((line_no, raw, schema.model_validate(row).model_dump()))
+            except ValidationError as e:
+                rejected += 1
+                error = e.errors(include_url=False, include_input=False)
+                rejects.write(json.dumps({"line": line_no, "row": raw, "error": error}, default=str) + "\n")
+            except ValueError as e:
+                rejected += 1
+                rejects.write(json.dumps({"line": line_no, "row": raw, "error": str(e)}, default=str) + "\n")
+
+        if kind == "applications" and valid:
+            # (candidate_id, job_id) is unique; one duplicate would fail the whole COPY
+            seen = existing_applications(db, [item for _, _, item in valid])
+            unique = []
+            for line_no, raw, item in valid:
+                pair = (item["candidate_id"], item["job_id"])
+                if pair in seen:
+                    rejected += 1
+                    rejects.write(json.dumps({"line": line_no, "row": raw, "error": "duplicate application"}, default=str) + "\n")
+                    continue
+                seen.add(pair)
+                unique.append((line_no, raw, item))
+            valid = unique
+
+        if valid:
+            items = [item for _, _, item in valid]
+            load_columns = columns
+            if id_map is not None:
+                ids = allocate_ids(db, model, len(items))
+                for item, new_id in zip(items, ids):
+                    item["id"] = new_id
+                load_columns = ["id"] + columns
+                id_map.append([
+                    (str(raw["id"]), item["id"]) for _, raw, item in valid if raw.get("id") is not None
+                ])
+            load_rows(db, model, load_columns, items)
+            if kind == "jobs":
+                facets.adjust(db, facets.new_job_rows(db, items))
+            elif kind == "applications":
+                facets.adjust(db, facets.new_application_rows(items))
+        save_checkpoint(db, checkpoint_name, position)
+        if id_map is not None:
+            save_checkpoint(db, f"ids:{kind}", id_map.entries)
+        db.commit()
+        loaded += len(valid)
+        if valid:
+            # Bulk loads touch too many companies to bump their counters one by
+            # one; bumping per batch keeps committed rows visible even if a
+            # later batch fails
+            query_cache.invalidate(model.__tablename__, table_epoch(model.__tablename__))
+
+        elapsed = time.monotonic() - started
+        print(
+            f"{kind}: {position} rows read, {loaded} loaded, {rejected} rejected, "
+            f"{loaded / elapsed if elapsed else 0:,.0f} rows/sec",
+            file=sys.stderr
+        )
+
+    batch: List[Tuple[int, Dict]] = []
+    position = rows_done
+    try:
+        for row in rows:
+            position += 1
+            batch.append((position, row))
+            if len(batch) >= batch_size:
+                flush(batch, position)
+                batch = []
+        if batch:
+            flush(batch, position)
+    finally:
+        rejects.close()
+
+    return loaded, rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import CSV or JSONL data")
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--state-dir", default=".import_state", help="Where id maps and rejected rows are kept")
+    parser.add_argument("--keep-fks", action="store_true", help="Use foreign keys as-is instead of mapping them")
+    parser.add_argument("--rejects", help="File for rows that fail validation")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    started = time.monotonic()
+    try:
+        loaded, rejected = import_file(
+            db, args.kind, args.path,
+            fmt=args.format,
+            batch_size=args.batch_size,
+            state_dir=args.state_dir,
+            keep_fks=args.keep_fks,
+            rejects_path=args.rejects
+        )
+    finally:
+        db.close()
+
+    elapsed = time.monotonic() - started
+    print(f"Imported {loaded} {args.kind} ({rejected} rejected) in {elapsed:.1f}s")
+    if args.kind == "jobs" and loaded:
+        print("Run `python -m app.services.dedup reindex` to index the new postings for duplicate detection")
+
+
+if __name__ == "__main__":
+    main()
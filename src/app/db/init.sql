@@ -1,2 +1,43 @@
+-- Schema changes for databases created before the matching model change.
+-- Fresh databases get these from Base.metadata.create_all (app/db/init_db.py).
 
+-- Structured job descriptions
+ALTER TABLE "JobPosting" ADD COLUMN IF NOT EXISTS description_data JSONB;
+ALTER TABLE "JobPosting" ADD COLUMN IF NOT EXISTS description_version INTEGER;
+ALTER TABLE "JobPosting" ADD COLUMN IF NOT EXISTS required_skills JSONB;
+CREATE INDEX IF NOT EXISTS "ix_JobPosting_required_skills" ON "JobPosting" USING gin (required_skills);
 
+-- Foreign key indexes used by facet maintenance and per-job filters
+CREATE INDEX IF NOT EXISTS "ix_JobPosting_company_id" ON "JobPosting" (company_id);
+CREATE INDEX IF NOT EXISTS "ix_Application_job_id" ON "Application" (job_id);
+
+-- Sharded facet counters
+ALTER TABLE "FacetCount" ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE "FacetCount" DROP CONSTRAINT IF EXISTS "FacetCount_pkey";
+ALTER TABLE "FacetCount" ADD CONSTRAINT "FacetCount_pkey" PRIMARY KEY (facet, value, shard);
+DROP INDEX IF EXISTS "ix_FacetCount_facet_count";
+
+-- Age scans of the archival job (archive tables themselves come from create_all)
+CREATE INDEX IF NOT EXISTS "ix_JobPosting_created_at" ON "JobPosting" (created_at);
+CREATE INDEX IF NOT EXISTS "ix_Application_created_at" ON "Application" (created_at);
+
+-- Change feed event ids (CHANGE_FEED_BACKEND=postgres also creates it on startup)
+CREATE SEQUENCE IF NOT EXISTS change_feed_seq;
+
+-- Resume skills (Skill itself comes from create_all)
+ALTER TABLE "Application" ADD COLUMN IF NOT EXISTS skill_bits BYTEA;
+ALTER TABLE "ApplicationArchive" ADD COLUMN IF NOT EXISTS skill_bits BYTEA;
+
+-- One application per (candidate_id, job_id). Older duplicates keep their
+-- lowest id; the rest are moved to the archive so the unique index can be
+-- built (run `python -m app.services.facets rebuild` afterwards)
+WITH duplicates AS (
+    DELETE FROM "Application" a
+    USING "Application" b
+    WHERE a.candidate_id = b.candidate_id AND a.job_id = b.job_id AND a.id > b.id
+    RETURNING a.*
+)
+INSERT INTO "ApplicationArchive" (id, candidate_id, name, email, job_id, status, skill_bits, created_at, updated_at)
+SELECT id, candidate_id, name, email, job_id, status, skill_bits, created_at, updated_at
+FROM duplicates;
+CREATE UNIQUE INDEX IF NOT EXISTS "ix_Application_candidate_id_job_id" ON "Application" (candidate_id, job_id);
@@ -1,17 +1,159 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 from app.core.config import settings
 from app.db.base import Base
 
+logger = logging.getLogger(__name__)
+
+# Methods whose handlers only read, and may be served by a replica
+READ_METHODS = ("GET", "HEAD")
+# Set on responses to writes; reads carrying it stay on the primary
+PRIMARY_COOKIE = "db_primary"
+
+REPLICA_LAG_SQL = {
+    "postgresql": text(
+        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+
+class ReplicaSet:
+    """
+    Round-robin over the replicas that passed their last health check.
+
+    A thread started with the first pick() queries every replica (measuring
+    replay lag on Postgres) every `check_interval` seconds; a replica that
+    fails, or lags more than `max_lag` seconds, gets no reads until it passes
+    again. Connection errors seen by get_db take a replica out immediately.
+    """
+
+    def __init__(self, engines: List[Engine], check_interval: float = 5.0, max_lag: float = 5.0):
+        self.engines = engines
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.healthy: Dict[Engine, bool] = {replica: True for replica in engines}
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+
+    def pick(self, exclude=()) -> Optional[Engine]:
+        if self.thread is None:
+            with self.lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+                    self.thread.start()
+        candidates = [replica for replica in self.engines if self.healthy[replica] and replica not in exclude]
+        if not candidates:
+            return None
+        return candidates[next(self.counter) % len(candidates)]
+
+    def mark_down(self, replica: Engine):
+        with self.lock:
+            was_healthy, self.healthy[replica] = self.healthy[replica], False
+        if was_healthy:
+            logger.warning("Replica %s is down, reading from the others", replica.url.render_as_string())
+
+    def check(self, replica: Engine) -> bool:
+        try:
+            with replica.connect() as connection:
+                lag = connection.execute(REPLICA_LAG_SQL.get(replica.dialect.name, text("SELECT 0"))).scalar()
+        except SQLAlchemyError:
+            # Includes pool timeouts as well as DBAPI errors
+            return False
+        return float(lag or 0) <= self.max_lag
+
+    def _run(self):
+        while True:
+            for replica in self.engines:
+                # Nothing may end this thread, or replicas would never come back
+                try:
+                    if not self.check(replica):
+                        self.mark_down(replica)
+                    elif not self.healthy[replica]:
+                        logger.info("Replica %s is back", replica.url.render_as_string())
+                        self.healthy[replica] = True
+                except Exception:
+                    logger.exception("Health check of replica %s failed", replica.url.render_as_string())
+                    self.mark_down(replica)
+            time.sleep(self.check_interval)
+
+
+class RoutingSession(Session):
+    """
+    Sends everything to the primary unless the session was pointed at a
+    replica with use_replica(); flushes and INSERT/UPDATE/DELETE always go
+    to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get("replica")
+        if replica is None or self._flushing or isinstance(clause, UpdateBase):
+            return super().get_bind(mapper, clause=clause, **kw)
+        return replica
+
+
 engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+replicas: Optional[ReplicaSet] = None
+if settings.DATABASE_REPLICA_URLS:
+    replicas = ReplicaSet(
+        [
+            create_engine(url.strip(), pool_pre_ping=True)
+            for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()
+        ],
+        check_interval=settings.REPLICA_HEALTH_CHECK_SECONDS,
+        max_lag=settings.REPLICA_MAX_LAG_SECONDS
+    )
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
+
+def use_replica(db: Session) -> bool:
+    """
+    Point the session's reads at a healthy replica, failing over to the next
+    one on connection errors. Stays on the primary if none can be reached.
+    """
+    if replicas is None:
+        return False
+    tried = []
+    while True:
+        replica = replicas.pick(exclude=tried)
+        if replica is None:
+            return False
+        try:
+            db.connection(bind_arguments={"bind": replica})
+        except SQLAlchemyError:
+            db.rollback()
+            replicas.mark_down(replica)
+            tried.append(replica)
+            continue
+        db.info["replica"] = replica
+        return True
+
+def replica_lag_window(db: Session) -> float:
+    """
+    How far behind the primary the session's reads may be, in seconds.
+    """
+    return settings.REPLICA_MAX_LAG_SECONDS if db.info.get("replica") is not None else 0.0
 
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
     try:
+        # Clients that just wrote read their writes from the primary
+        if request.method in READ_METHODS and PRIMARY_COOKIE not in request.cookies:
+            use_replica(db)
         yield db
     finally:
         db.close()
 
 def init_db():
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
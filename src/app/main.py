@@ -1,7 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.endpoints import companies, jobs, applications
+from app.api.compression import add_compression
+from app.api.endpoints import companies, jobs, applications, changes
+from app.api.profiling import add_profiling
+from app.api.read_your_writes import add_read_your_writes
+from app.services.archival import archival_worker
+from app.services.change_feed import change_feed
+from app.services.facets import rollup_worker
+from app.services.query_cache import query_cache
+from app.services.skills import shutdown_pool
+from app.services.write_behind import write_behind
 
 app = FastAPI(title="Job Board API")
 
@@ -14,10 +23,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+add_compression(app)
+add_read_your_writes(app)
+add_profiling(app)
+
 # Include routers with API version prefix
 app.include_router(companies.router, prefix=f"{settings.API_V1_STR}/companies", tags=["companies"])
 app.include_router(jobs.router, prefix=f"{settings.API_V1_STR}/jobs", tags=["jobs"])
 app.include_router(applications.router, prefix=f"{settings.API_V1_STR}/applications", tags=["applications"])
+app.include_router(changes.router, prefix=f"{settings.API_V1_STR}/changes", tags=["changes"])
+
+@app.on_event("startup")
+def start_background_jobs():
+    # Writes made while no worker was running bumped no counters
+    query_cache.reset()
+    # Replays submissions a previous process logged but never flushed
+    if write_behind is not None:
+        write_behind.start()
+    if archival_worker is not None:
+        archival_worker.start()
+    change_feed.start()
+    if rollup_worker is not None:
+        rollup_worker.start()
+
+@app.on_event("shutdown")
+def stop_background_jobs():
+    change_feed.stop()
+    if rollup_worker is not None:
+        rollup_worker.stop()
+    shutdown_pool()
+    if archival_worker is not None:
+        archival_worker.stop()
+    if write_behind is not None:
+        write_behind.stop()
 
 @app.get("/")
 def read_root():
@@ -1,8 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, BigInteger, SmallInteger, String, Float, Boolean, ForeignKey, DateTime, JSON, Index, LargeBinary, Table
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from app.db.base import Base
+from app.services.job_descriptions import rendered_description
+
+# JSONB on Postgres (GIN indexable), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
 
 class Company(Base):
     __tablename__ = "Company"
@@ -24,17 +29,32 @@ class JobPosting(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
-    company_id = Column(Integer, ForeignKey("Company.id"))
+    company_id = Column(Integer, ForeignKey("Company.id"), index=True)
     location = Column(String)
     description = Column(String)
+    # Structured JobDescriptionComponents and the schema version they were stored with
+    description_data = Column(JSONType)
+    description_version = Column(Integer)
+    # Normalized copy of description_data["required_skills"] for skill lookups
+    required_skills = Column(JSONType)
     requirements = Column(String)
     salary_range = Column(String)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     company = relationship("Company", back_populates="job_postings")
     applications = relationship("Application", back_populates="job")
 
+    __table_args__ = (
+        Index("ix_JobPosting_required_skills", "required_skills", postgresql_using="gin"),
+    )
+
+    @property
+    def rendered_description(self):
+        return rendered_description(
+            self.id, self.description, self.description_data, self.description_version, self.updated_at
+        )
+
 class Application(Base):
     __tablename__ = "Application"
 
@@ -42,9 +62,73 @@ class Application(Base):
     candidate_id = Column(String, index=True)
     name = Column(String)
     email = Column(String, index=True)
-    job_id = Column(Integer, ForeignKey("JobPosting.id"))
+    job_id = Column(Integer, ForeignKey("JobPosting.id"), index=True)
     status = Column(String)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bitset of Skill ids found in the resume (bit n = Skill n); NULL until one is uploaded
+    skill_bits = Column(LargeBinary)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
-    job = relationship("JobPosting", back_populates="applications") 
\ No newline at end of file
+    job = relationship("JobPosting", back_populates="applications") 
+
+    __table_args__ = (
+        # One application per candidate and posting; write-behind replays rely on it
+        Index("ix_Application_candidate_id_job_id", "candidate_id", "job_id", unique=True),
+    )
+
+def archive_table(model) -> Table:
+    """
+    Same columns as the model's table, without foreign keys, plus archived_at.
+    Rows are moved here by services/archival.py.
+    """
+    return Table(
+        f"{model.__tablename__}Archive",
+        Base.metadata,
+        *[
+            Column(column.name, column.type, primary_key=column.primary_key, index=column.index)
+            for column in model.__table__.columns
+        ],
+        Column("archived_at", DateTime(timezone=True), server_default=func.now(), index=True),
+    )
+
+ApplicationArchive = archive_table(Application)
+JobPostingArchive = archive_table(JobPosting)
+
+class JobPostingSignature(Base):
+    """MinHash signature of a posting, used to verify LSH candidates."""
+    __tablename__ = "JobPostingSignature"
+
+    job_id = Column(Integer, ForeignKey("JobPosting.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+
+class JobPostingLSHBucket(Base):
+    """One row per (band, bucket) a posting hashes to; postings sharing a row are duplicate candidates."""
+    __tablename__ = "JobPostingLSHBucket"
+
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    job_id = Column(Integer, ForeignKey("JobPosting.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+class ImportCheckpoint(Base):
+    """Rows committed so far per bulk import source, updated in the same transaction as the rows."""
+    __tablename__ = "ImportCheckpoint"
+
+    name = Column(String, primary_key=True)
+    rows_done = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class FacetCount(Base):
+    """Row count per facet value, split over FACET_COUNTER_SHARDS rows and maintained by the write paths (see services/facets.py)."""
+    __tablename__ = "FacetCount"
+
+    facet = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, default=0)
+    count = Column(BigInteger, nullable=False, default=0)
+
+class Skill(Base):
+    """Interned skill names; the id is the skill's bit in Application.skill_bits."""
+    __tablename__ = "Skill"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, HttpUrl, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, HttpUrl, EmailStr, Field, AliasChoices
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 
 # Company Schemas
@@ -43,6 +43,13 @@ class JobPostingUpdate(JobPostingBase):
 
 class JobPosting(JobPostingBase):
     id: int
+    # Plain text if set, otherwise rendered from description_data on read
+    description: Optional[str] = Field(
+        default=None, validation_alias=AliasChoices("rendered_description", "description")
+    )
+    description_data: Optional[Dict[str, Any]] = None
+    description_version: Optional[int] = None
+    required_skills: Optional[List[str]] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -59,6 +66,17 @@ class JobDescriptionResponse(BaseModel):
     company_name: str
     job_title: str
 
+# Duplicate Detection Schemas
+class DuplicateMatch(BaseModel):
+    job_id: int
+    similarity: float
+
+# Facet Schemas
+class FacetValue(BaseModel):
+    value: Optional[str] = None
+    count: int
+    label: Optional[str] = None
+
 # Application Schemas
 class ApplicationBase(BaseModel):
     job_id: int
@@ -83,4 +101,32 @@ class Application(ApplicationBase):
     updated_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class ApplicationAccepted(BaseModel):
+    job_id: int
+    candidate_id: str
+    status: str = "Queued"
+
+# Resume Schemas
+class ResumeUpload(BaseModel):
+    resume_text: str = Field(..., max_length=200_000)
+
+class ResumeUploadItem(ResumeUpload):
+    application_id: int
+
+class ResumeSkills(BaseModel):
+    application_id: int
+    skills: List[str]
+
+class RankedCandidate(BaseModel):
+    application_id: int
+    candidate_id: str
+    name: Optional[str] = None
+    email: Optional[str] = None
+    status: Optional[str] = None
+    # Share of the posting's required skills found in the resume
+    score: float
+    matched_skills: List[str]
+    missing_skills: List[str]
+    has_resume: bool
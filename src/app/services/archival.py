@@ -0,0 +1,224 @@
+"""
+Archival of old applications and job postings.
+
+Closed applications older than ARCHIVE_APPLICATIONS_AFTER_DAYS, and postings
+older than ARCHIVE_JOBS_AFTER_DAYS with no applications left, are moved in
+batches to ApplicationArchive / JobPostingArchive: each batch is one
+DELETE ... RETURNING plus INSERT in a single transaction. The batch is
+locked first on Postgres (SKIP LOCKED, so rows busy in a request are left
+for the next run), and the DELETE repeats the selection predicates, so a
+row that changed after it was picked (a status update, an application to
+an idle posting) stays where it is; facet counts and change events come
+from the rows actually deleted. The hot tables then only hold live rows,
+and list endpoints read the archive tables only when called with
+?include_archived=true.
+
+Runs from a background thread when ARCHIVE_INTERVAL_MINUTES is set, or on
+demand with `python -m app.services.archival`.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import Table, exists, select, text, union_all
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import models
+from app.services import facets
+from app.services.change_feed import change_feed
+from app.services.query_cache import job_posting_counters, query_cache
+
+logger = logging.getLogger(__name__)
+
+# Only one worker archives a given batch on Postgres
+ARCHIVE_LOCK_ID = 0x4A0C
+
+
+def _try_lock(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return db.execute(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": ARCHIVE_LOCK_ID}).scalar()
+
+
+def _move(db: Session, model, archive: Table, ids: List[int], conditions) -> List[Row]:
+    """
+    Move the rows in `ids` that still match `conditions` and return them.
+    """
+    table = model.__table__
+    moved = db.execute(
+        table.delete().where(table.c.id.in_(ids), *conditions).returning(*table.columns)
+    ).all()
+    if moved:
+        db.execute(archive.insert(), [dict(row._mapping) for row in moved])
+    return moved
+
+
+def archive_applications(
+    db: Session,
+    older_than: datetime,
+    statuses: Optional[Sequence[str]] = None,
+    batch_size: int = 1000
+) -> int:
+    conditions = [models.Application.created_at < older_than]
+    if statuses:
+        conditions.append(models.Application.status.in_(statuses))
+    moved = 0
+    while True:
+        if not _try_lock(db):
+            break
+        batch = (
+            db.query(models.Application.id, models.JobPosting.company_id)
+            .outerjoin(models.JobPosting, models.JobPosting.id == models.Application.job_id)
+            .filter(*conditions)
+            .order_by(models.Application.id)
+            .limit(batch_size)
+            .with_for_update(of=models.Application, skip_locked=True)
+            .all()
+        )
+        if not batch:
+            db.rollback()
+            break
+
+        companies = {row.id: row.company_id for row in batch}
+        rows = _move(db, models.Application, models.ApplicationArchive, list(companies), conditions)
+        facets.adjust(db, {key: -count for key, count in facets.new_application_rows(
+            [{"status": row.status} for row in rows]
+        ).items()})
+        db.commit()
+        change_feed.publish_many("application", "archived", [
+            {"application_id": row.id, "job_id": row.job_id, "company_id": companies[row.id]} for row in rows
+        ])
+        moved += len(rows)
+    return moved
+
+
+def archive_job_postings(db: Session, older_than: datetime, batch_size: int = 1000) -> int:
+    conditions = [
+        models.JobPosting.created_at < older_than,
+        ~exists().where(models.Application.job_id == models.JobPosting.id),
+    ]
+    moved = 0
+    while True:
+        if not _try_lock(db):
+            break
+        # FOR UPDATE conflicts with the key-share lock an application insert
+        # takes on its posting, so none can be added once the batch is locked
+        batch = (
+            db.query(models.JobPosting.id, models.Company.industry)
+            .outerjoin(models.Company, models.Company.id == models.JobPosting.company_id)
+            .filter(*conditions)
+            .order_by(models.JobPosting.id)
+            .limit(batch_size)
+            .with_for_update(of=models.JobPosting, skip_locked=True)
+            .all()
+        )
+        if not batch:
+            db.rollback()
+            break
+
+        industries = {row.id: row.industry for row in batch}
+        rows = _move(db, models.JobPosting, models.JobPostingArchive, list(industries), conditions)
+        ids = [row.id for row in rows]
+        # Cascades on Postgres; SQLite doesn't enforce foreign keys
+        db.query(models.JobPostingLSHBucket).filter(models.JobPostingLSHBucket.job_id.in_(ids)).delete()
+        db.query(models.JobPostingSignature).filter(models.JobPostingSignature.job_id.in_(ids)).delete()
+
+        before: Dict = {}
+        for row in rows:
+            for key in facets.job_values(row, industries[row.id]):
+                before[key] = before.get(key, 0) - 1
+        facets.adjust(db, before)
+        db.commit()
+        query_cache.invalidate(*job_posting_counters(*(row.company_id for row in rows)))
+        change_feed.publish_many("job", "archived", [
+            {"job_id": row.id, "company_id": row.company_id} for row in rows
+        ])
+        moved += len(rows)
+    return moved
+
+
+def archive_all(db: Session) -> Dict[str, int]:
+    now = datetime.now(timezone.utc)
+    statuses = [status.strip() for status in settings.ARCHIVE_APPLICATION_STATUSES.split(",") if status.strip()]
+    # Applications first, so postings they were holding back can go in the same run
+    applications = archive_applications(
+        db, now - timedelta(days=settings.ARCHIVE_APPLICATIONS_AFTER_DAYS), statuses, settings.ARCHIVE_BATCH_SIZE
+    )
+    jobs = archive_job_postings(db, now - timedelta(days=settings.ARCHIVE_JOBS_AFTER_DAYS), settings.ARCHIVE_BATCH_SIZE)
+    return {"applications": applications, "jobs": jobs}
+
+
+def select_with_archive(model, archive: Table, columns: Sequence[str], where: Callable) -> "select":
+    """
+    UNION ALL of the hot and archive tables over `columns`.
+
+    `where` receives a table's column collection and returns filter clauses,
+    so the same filters apply to both sides.
+    """
+    def part(table: Table):
+        return select(*(table.c[name] for name in columns)).where(*where(table.c))
+
+    return union_all(part(model.__table__), part(archive)).subquery()
+
+
+def read_with_archive(
+    db: Session,
+    model,
+    archive: Table,
+    columns: Sequence[str],
+    where: Callable,
+    skip: int = 0,
+    limit: int = 100
+) -> List[Dict]:
+    rows = select_with_archive(model, archive, columns, where)
+    result = db.execute(select(rows).order_by(rows.c.id).offset(skip).limit(limit))
+    return [dict(row) for row in result.mappings()]
+
+
+class ArchivalWorker:
+    def __init__(self, interval_minutes: float, session_factory=SessionLocal):
+        self.interval = interval_minutes * 60
+        self.session_factory = session_factory
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="archival", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            db = self.session_factory()
+            try:
+                moved = archive_all(db)
+                if any(moved.values()):
+                    logger.info("Archived %(applications)d applications and %(jobs)d job postings", moved)
+            except Exception:
+                db.rollback()
+                logger.exception("Archival run failed")
+            finally:
+                db.close()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+archival_worker: Optional[ArchivalWorker] = None
+if settings.ARCHIVE_INTERVAL_MINUTES > 0:
+    archival_worker = ArchivalWorker(settings.ARCHIVE_INTERVAL_MINUTES)
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        moved = archive_all(db)
+        print(f"Archived {moved['applications']} applications and {moved['jobs']} job postings")
+    finally:
+        db.close()
@@ -0,0 +1,207 @@
+"""
+Change feed for job postings and applications.
+
+The router write paths publish an event after each commit, e.g.
+{"type": "job", "action": "updated", "job_id": 3, "company_id": 1}. Every
+event gets a sequence number and is kept in a bounded replay buffer, so a
+client reconnecting with Last-Event-ID gets what it missed; if that is no
+longer in the buffer it gets a `reset` event and should refetch instead.
+
+CHANGE_FEED_BACKEND "memory" numbers and fans out events within the process,
+which is enough for a single worker. "postgres" takes sequence numbers from
+the change_feed_seq sequence and sends events through NOTIFY; every worker
+LISTENs, so subscribers see writes made by any worker or by root main.py.
+Publishers hold an advisory lock from nextval until commit, so notifications
+(delivered in commit order) arrive in id order, which replay relies on.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import select
+import threading
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, Set
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.services.streaming import sse_event
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "change_feed"
+SEQUENCE = "change_feed_seq"
+TYPES = ("job", "application")
+# Serializes id allocation and NOTIFY across publishers
+PUBLISH_LOCK_ID = 0x4A0D
+KEEPALIVE = b": keepalive\n\n"
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queued: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.max_queued = max_queued
+        self.overflowed = False
+
+    def deliver(self, event: Dict):
+        # Runs on the subscriber's loop
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.max_queued:
+            # Too slow to keep up; it gets a reset and has to refetch
+            self.overflowed = True
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(event)
+
+
+class ChangeFeed:
+    def __init__(self, backend: str = "memory", buffer_size: int = 10000, max_queued: int = 1000):
+        self.backend = backend
+        self.buffer: deque = deque(maxlen=buffer_size)
+        self.max_queued = max_queued
+        self.subscribers: Set[Subscriber] = set()
+        self.latest = 0
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def publish(self, entity: str, action: str, **keys):
+        """
+        Record a committed change. Safe to call from any thread.
+        """
+        self.publish_many(entity, action, [keys])
+
+    def publish_many(self, entity: str, action: str, rows: Iterable[Dict]):
+        """
+        publish() for many rows, with one round trip on the postgres backend.
+        """
+        events = [{"type": entity, "action": action, **keys} for keys in rows]
+        if not events:
+            return
+        if self.backend != "postgres":
+            with self.lock:
+                for event in events:
+                    self._dispatch(dict(event, id=next(self.counter)))
+            return
+
+        from app.db.session import engine
+
+        try:
+            with engine.begin() as connection:
+                # Held until commit: ids then reach listeners in increasing order
+                connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": PUBLISH_LOCK_ID})
+                for event in events:
+                    seq = connection.execute(text(f"SELECT nextval('{SEQUENCE}')")).scalar()
+                    connection.execute(
+                        text("SELECT pg_notify(:channel, :payload)"),
+                        {"channel": CHANNEL, "payload": json.dumps(dict(event, id=seq))}
+                    )
+        except Exception:
+            # The write itself is committed; subscribers catch up on their next reset
+            logger.exception("Publishing %s %s to the change feed failed", entity, action)
+
+    def _dispatch(self, event: Dict):
+        # Caller holds self.lock
+        self.buffer.append(event)
+        self.latest = max(self.latest, event["id"])
+        for subscriber in self.subscribers:
+            subscriber.loop.call_soon_threadsafe(subscriber.deliver, event)
+
+    def start(self):
+        if self.backend != "postgres" or self.thread is not None:
+            return
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._listen, name="change-feed", daemon=True)
+        self.thread.start()
+
+    def _listen(self):
+        from app.db.session import engine
+
+        while not self.stopping.is_set():
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                connection = raw.driver_connection
+                connection.autocommit = True
+                cursor = connection.cursor()
+                cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {SEQUENCE}")
+                cursor.execute(f"LISTEN {CHANNEL}")
+                while not self.stopping.is_set():
+                    if select.select([connection], [], [], 1.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    with self.lock:
+                        while connection.notifies:
+                            self._dispatch(json.loads(connection.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Change feed listener failed, reconnecting")
+                self.stopping.wait(1.0)
+            finally:
+                if raw is not None:
+                    # Not returned to the pool in autocommit/LISTEN state
+                    raw.invalidate()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    async def events(
+        self,
+        last_event_id: Optional[int] = None,
+        matches: Callable[[Dict], bool] = lambda event: True,
+        keepalive: float = 15.0
+    ) -> AsyncIterator[bytes]:
+        """
+        SSE frames for events after `last_event_id` that pass `matches`,
+        then for new events as they are published.
+        """
+        subscriber = Subscriber(asyncio.get_running_loop(), self.max_queued)
+        with self.lock:
+            backlog = list(self.buffer)
+            latest = self.latest
+            self.subscribers.add(subscriber)
+
+        def frame(event: Dict) -> bytes:
+            data = {key: value for key, value in event.items() if key != "id"}
+            return sse_event(data, event_id=event["id"])
+
+        def reset() -> bytes:
+            return sse_event({"last_event_id": self.latest}, event_id=self.latest, event="reset")
+
+        try:
+            if last_event_id is not None:
+                oldest = backlog[0]["id"] if backlog else latest + 1
+                if last_event_id < oldest - 1 or last_event_id > latest:
+                    yield reset()
+                else:
+                    for event in backlog:
+                        if event["id"] > last_event_id and matches(event):
+                            yield frame(event)
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                if event is None:
+                    yield reset()
+                    return
+                if matches(event):
+                    yield frame(event)
+        finally:
+            with self.lock:
+                self.subscribers.discard(subscriber)
+
+
+change_feed = ChangeFeed(
+    settings.CHANGE_FEED_BACKEND,
+    buffer_size=settings.CHANGE_FEED_BUFFER_SIZE,
+    max_queued=settings.CHANGE_FEED_MAX_QUEUED
+)
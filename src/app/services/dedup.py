@@ -0,0 +1,331 @@
+"""
+Near-duplicate detection for job postings.
+
+Each posting gets a MinHash signature over word shingles of its title,
+description and requirements. The signature is split into bands and every
+band is hashed, together with the company id, into a JobPostingLSHBucket
+row, so postings of the same company that share any bucket are candidates;
+candidates are then verified against their stored signatures. Lookups only
+touch the posting's own buckets and read at most DEDUP_MAX_BUCKET_CANDIDATES
+postings from each, which keeps them independent of table size, and
+everything runs offline. Postings with fewer than DEDUP_MIN_SHINGLES
+shingles (e.g. a bare title before its description is generated) are too
+short to compare and are not indexed.
+"""
+import hashlib
+import random
+import re
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import models
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+# Fixed seed so signatures are comparable across processes and restarts
+SEED = 1392
+
+NUM_PERM = settings.DEDUP_NUM_PERM
+BANDS = settings.DEDUP_BANDS
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+_rng = random.Random(SEED)
+_PERMUTATIONS = [
+    (_rng.randrange(1, MERSENNE_PRIME), _rng.randrange(0, MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+
+
+def _hash32(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def shingles(*texts: Optional[str], size: int = settings.DEDUP_SHINGLE_SIZE) -> Set[int]:
+    """
+    Hashed word shingles over the concatenated texts.
+    """
+    tokens = _TOKEN.findall(" ".join(text for text in texts if text).lower())
+    if len(tokens) < size:
+        return {_hash32(" ".join(tokens))} if tokens else set()
+    return {_hash32(" ".join(tokens[i:i + size])) for i in range(len(tokens) - size + 1)}
+
+
+def minhash(values: Iterable[int]) -> List[int]:
+    values = list(values)
+    if not values:
+        return [MAX_HASH] * NUM_PERM
+    return [
+        min((a * x + b) % MERSENNE_PRIME for x in values) & MAX_HASH
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def signature_for(job: models.JobPosting) -> Optional[List[int]]:
+    """
+    The posting's signature, or None when its text is too short to compare.
+    """
+    values = shingles(job.title, job.rendered_description, job.requirements)
+    if len(values) < settings.DEDUP_MIN_SHINGLES:
+        return None
+    return minhash(values)
+
+
+def pack(signature: List[int]) -> bytes:
+    return array("I", signature).tobytes()
+
+
+def unpack(data: bytes) -> array:
+    signature = array("I")
+    signature.frombytes(data)
+    return signature
+
+
+def similarity(left, right) -> float:
+    """
+    Estimated Jaccard similarity of two signatures.
+    """
+    return sum(1 for a, b in zip(left, right) if a == b) / NUM_PERM
+
+
+def band_buckets(signature: List[int], company_id: Optional[int]) -> List[Tuple[int, int]]:
+    # Company in the key: only postings of the same company are duplicates
+    company = str(company_id).encode("ascii")
+    buckets = []
+    for band in range(BANDS):
+        rows = array("I", signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]).tobytes()
+        digest = hashlib.blake2b(rows, digest_size=8, key=company).digest()
+        buckets.append((band, int.from_bytes(digest, "little", signed=True)))
+    return buckets
+
+
+def index_posting(db: Session, job: models.JobPosting) -> Optional[List[int]]:
+    """
+    Store the posting's signature and LSH buckets, or drop them if it is now
+    too short to compare. Does not commit.
+    """
+    signature = signature_for(job)
+    remove_posting(db, job.id)
+    if signature is not None:
+        _add(db, job, signature)
+    return signature
+
+
+def _add(db: Session, job: models.JobPosting, signature: List[int]):
+    db.add(models.JobPostingSignature(job_id=job.id, signature=pack(signature)))
+    db.add_all(
+        models.JobPostingLSHBucket(band=band, bucket=bucket, job_id=job.id)
+        for band, bucket in band_buckets(signature, job.company_id)
+    )
+
+
+def remove_posting(db: Session, job_id: int):
+    db.query(models.JobPostingLSHBucket).filter(models.JobPostingLSHBucket.job_id == job_id).delete()
+    db.query(models.JobPostingSignature).filter(models.JobPostingSignature.job_id == job_id).delete()
+
+
+def find_similar(
+    db: Session,
+    signature: Optional[List[int]],
+    company_id: Optional[int],
+    threshold: float = settings.DEDUP_THRESHOLD,
+    exclude_id: Optional[int] = None,
+    limit: int = 20
+) -> List[Tuple[int, float]]:
+    """
+    Postings of `company_id` whose estimated similarity to `signature` is at
+    least `threshold`, most similar first. None (too short) matches nothing.
+    """
+    if signature is None:
+        return []
+    Bucket = models.JobPostingLSHBucket
+    # Each bucket contributes at most DEDUP_MAX_BUCKET_CANDIDATES postings
+    per_bucket = [
+        select(Bucket.job_id)
+        .where(Bucket.band == band, Bucket.bucket == bucket)
+        .limit(settings.DEDUP_MAX_BUCKET_CANDIDATES)
+        .subquery()
+        for band, bucket in band_buckets(signature, company_id)
+    ]
+    candidate_ids = union_all(*(select(bucket.c.job_id) for bucket in per_bucket))
+    candidates = (
+        db.query(models.JobPostingSignature.job_id, models.JobPostingSignature.signature)
+        .filter(models.JobPostingSignature.job_id.in_(candidate_ids))
+    )
+    if exclude_id is not None:
+        candidates = candidates.filter(models.JobPostingSignature.job_id != exclude_id)
+
+    matches = []
+    for job_id, packed in candidates:
+        score = similarity(signature, unpack(packed))
+        if score >= threshold:
+            matches.append((job_id, score))
+    matches.sort(key=lambda match: (-match[1], match[0]))
+    return matches[:limit]
+
+
+def find_duplicates(
+    db: Session,
+    job_id: int,
+    threshold: float = settings.DEDUP_THRESHOLD,
+    limit: int = 20
+) -> List[Tuple[int, float]]:
+    """
+    Read-only: a posting that isn't indexed yet has its signature computed
+    in memory, and indexing is left to the write paths and `reindex`.
+    """
+    job = db.query(models.JobPosting).filter(models.JobPosting.id == job_id).first()
+    if job is None:
+        return []
+    row = db.query(models.JobPostingSignature).filter(models.JobPostingSignature.job_id == job_id).first()
+    signature = signature_for(job) if row is None else unpack(row.signature)
+    return find_similar(db, signature, job.company_id, threshold, exclude_id=job_id, limit=limit)
+
+
+def duplicate_report(
+    db: Session,
+    threshold: float = settings.DEDUP_THRESHOLD,
+    batch_size: int = 1000
+) -> List[Dict]:
+    """
+    Group every indexed posting into clusters of near-duplicates. Reads
+    every shared bucket, so it is run offline from the CLI below.
+
+    Only buckets shared by more than one posting are read, and each candidate
+    pair is verified once. The lowest id in a cluster is its canonical posting.
+    """
+    Bucket = models.JobPostingLSHBucket
+    collisions = (
+        db.query(Bucket.band, Bucket.bucket)
+        .group_by(Bucket.band, Bucket.bucket)
+        .having(func.count(Bucket.job_id) > 1)
+        .yield_per(batch_size)
+    )
+
+    pairs: Set[Tuple[int, int]] = set()
+    batch = []
+    for collision in collisions:
+        batch.append(collision)
+        if len(batch) >= batch_size:
+            pairs.update(_candidate_pairs(db, batch))
+            batch = []
+    if batch:
+        pairs.update(_candidate_pairs(db, batch))
+
+    signatures: Dict[int, array] = {}
+    needed = sorted({job_id for pair in pairs for job_id in pair})
+    for start in range(0, len(needed), batch_size):
+        chunk = needed[start:start + batch_size]
+        for job_id, packed in db.query(
+            models.JobPostingSignature.job_id, models.JobPostingSignature.signature
+        ).filter(models.JobPostingSignature.job_id.in_(chunk)):
+            signatures[job_id] = unpack(packed)
+
+    parent: Dict[int, int] = {}
+
+    def find(job_id: int) -> int:
+        parent.setdefault(job_id, job_id)
+        while parent[job_id] != job_id:
+            parent[job_id] = parent[parent[job_id]]
+            job_id = parent[job_id]
+        return job_id
+
+    for left, right in pairs:
+        if left not in signatures or right not in signatures:
+            continue
+        score = similarity(signatures[left], signatures[right])
+        if score >= threshold:
+            root_left, root_right = find(left), find(right)
+            if root_left != root_right:
+                parent[max(root_left, root_right)] = min(root_left, root_right)
+
+    clusters: Dict[int, List[int]] = {}
+    for job_id in parent:
+        clusters.setdefault(find(job_id), []).append(job_id)
+
+    report = []
+    for canonical_id, members in sorted(clusters.items()):
+        duplicates = [
+            {
+                "job_id": job_id,
+                "similarity": similarity(signatures[canonical_id], signatures[job_id])
+            }
+            for job_id in sorted(members) if job_id != canonical_id
+        ]
+        report.append({"canonical_id": canonical_id, "duplicates": duplicates})
+    return report
+
+
+def _candidate_pairs(db: Session, collisions) -> Set[Tuple[int, int]]:
+    Bucket = models.JobPostingLSHBucket
+    members: Dict[Tuple[int, int], List[int]] = {}
+    rows = db.query(Bucket.band, Bucket.bucket, Bucket.job_id).filter(or_(*(
+        and_(Bucket.band == band, Bucket.bucket == bucket) for band, bucket in collisions
+    )))
+    for band, bucket, job_id in rows:
+        members.setdefault((band, bucket), []).append(job_id)
+
+    pairs = set()
+    for job_ids in members.values():
+        job_ids.sort()
+        for i, left in enumerate(job_ids):
+            for right in job_ids[i + 1:]:
+                pairs.add((left, right))
+    return pairs
+
+
+def reindex(db: Session, batch_size: int = 1000) -> int:
+    """
+    Rebuild signatures and buckets for every posting, e.g. after changing
+    DEDUP_NUM_PERM, DEDUP_BANDS or DEDUP_MIN_SHINGLES.
+    """
+    db.query(models.JobPostingLSHBucket).delete()
+    db.query(models.JobPostingSignature).delete()
+    db.commit()
+
+    count = 0
+    last_id = 0
+    while True:
+        jobs = (
+            db.query(models.JobPosting)
+            .filter(models.JobPosting.id > last_id)
+            .order_by(models.JobPosting.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not jobs:
+            break
+        for job in jobs:
+            signature = signature_for(job)
+            if signature is not None:
+                _add(db, job, signature)
+        db.commit()
+        count += len(jobs)
+        last_id = jobs[-1].id
+        db.expunge_all()
+    return count
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "report"
+    db = SessionLocal()
+    try:
+        if command == "reindex":
+            print(f"Indexed {reindex(db)} job postings")
+        elif command == "report":
+            for cluster in duplicate_report(db):
+                ids = ", ".join(f"{d['job_id']} ({d['similarity']:.2f})" for d in cluster["duplicates"])
+                print(f"{cluster['canonical_id']}: {ids}")
+        else:
+            print("Usage: python -m app.services.dedup [reindex|report]")
+            sys.exit(1)
+    finally:
+        db.close()
@@ -0,0 +1,258 @@
+"""
+Facet counts for the job board sidebar.
+
+FacetCount holds up to FACET_COUNTER_SHARDS rows per (facet, value). The
+router write paths compute which facet values a row had before and after the
+write and add the difference to a random shard in the same transaction, so
+concurrent writes of a popular value (every new application is "Pending")
+rarely wait on each other's row lock. Reads sum the shards, which is still
+a lookup on the aggregate table rather than a scan of JobPosting or Application.
+
+Summing every shard of every value got slow once most values had all their
+shards (~50 ms at 1M postings), so every FACET_ROLLUP_INTERVAL_SECONDS the
+other shards are folded back into shard 0 and reads only add the few rows
+written since. `python -m app.services.facets rebuild` recomputes everything
+with GROUP BY; `rollup` folds the shards once.
+"""
+import logging
+import random
+import sys
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import models
+
+logger = logging.getLogger(__name__)
+
+JOB_FACETS = ("location", "company", "industry")
+APPLICATION_FACETS = ("status",)
+
+# Stored value for rows where the column is NULL
+MISSING = ""
+
+
+def _key(facet: str, value) -> Tuple[str, str]:
+    return facet, MISSING if value is None else str(value)
+
+
+def job_values(job: models.JobPosting, industry: Optional[str]) -> List[Tuple[str, str]]:
+    return [
+        _key("job.location", job.location),
+        _key("job.company", job.company_id),
+        _key("job.industry", industry),
+    ]
+
+
+def job_snapshot(db: Session, job: models.JobPosting) -> List[Tuple[str, str]]:
+    """
+    Facet values of a posting as it is now; take one before and one after a write.
+    """
+    industry = None
+    if job.company_id is not None:
+        industry = db.query(models.Company.industry).filter(models.Company.id == job.company_id).scalar()
+    return job_values(job, industry)
+
+
+def application_values(application: models.Application) -> List[Tuple[str, str]]:
+    return [_key("application.status", application.status)]
+
+
+def apply(db: Session, before: Iterable[Tuple[str, str]] = (), after: Iterable[Tuple[str, str]] = ()):
+    """
+    Move counts from the `before` values to the `after` values. Does not commit.
+    """
+    deltas = Counter(after)
+    deltas.subtract(Counter(before))
+    adjust(db, deltas)
+
+
+def adjust(db: Session, deltas: Dict[Tuple[str, str], int], shard: Optional[int] = None):
+    """
+    Add `deltas` to one shard, random unless given. Does not commit.
+    """
+    if shard is None:
+        shard = random.randrange(max(settings.FACET_COUNTER_SHARDS, 1))
+    # Sorted so concurrent writers and rollup() lock rows in the same order
+    rows = [
+        {"facet": facet, "value": value, "shard": shard, "count": delta}
+        for (facet, value), delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert(models.FacetCount.__table__)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["facet", "value", "shard"],
+                set_={"count": models.FacetCount.__table__.c.count + stmt.excluded["count"]}
+            ),
+            rows
+        )
+        return
+
+    for row in rows:
+        updated = db.query(models.FacetCount).filter(
+            models.FacetCount.facet == row["facet"], models.FacetCount.value == row["value"],
+            models.FacetCount.shard == row["shard"]
+        ).update({models.FacetCount.count: models.FacetCount.count + row["count"]}, synchronize_session=False)
+        if not updated:
+            db.add(models.FacetCount(**row))
+
+
+def new_job_rows(db: Session, rows: List[Dict]) -> Counter:
+    """
+    Deltas for freshly inserted posting rows given as dicts (bulk paths).
+    """
+    company_ids = {row.get("company_id") for row in rows} - {None}
+    industries = dict(
+        db.query(models.Company.id, models.Company.industry).filter(models.Company.id.in_(company_ids))
+    ) if company_ids else {}
+    deltas: Counter = Counter()
+    for row in rows:
+        deltas[_key("job.location", row.get("location"))] += 1
+        deltas[_key("job.company", row.get("company_id"))] += 1
+        deltas[_key("job.industry", industries.get(row.get("company_id")))] += 1
+    return deltas
+
+
+def new_application_rows(rows: List[Dict]) -> Counter:
+    return Counter(_key("application.status", row.get("status")) for row in rows)
+
+
+def company_industry_changed(db: Session, company_id: int, old: Optional[str], new: Optional[str]):
+    """
+    Every posting of the company moves between industry values.
+    """
+    if old == new:
+        return
+    postings = db.query(func.count(models.JobPosting.id)).filter(models.JobPosting.company_id == company_id).scalar()
+    if postings:
+        adjust(db, {_key("job.industry", old): -postings, _key("job.industry", new): postings})
+
+
+def read(db: Session, names: Iterable[str], prefix: str, limit: int = 20) -> Dict[str, List[Dict]]:
+    """
+    Top `limit` values by count for each facet.
+    """
+    result = {}
+    for name in names:
+        total = func.sum(models.FacetCount.count)
+        rows = (
+            db.query(models.FacetCount.value, total)
+            .filter(models.FacetCount.facet == f"{prefix}.{name}")
+            .group_by(models.FacetCount.value)
+            .having(total > 0)
+            .order_by(total.desc(), models.FacetCount.value)
+            .limit(limit)
+            .all()
+        )
+        result[name] = [{"value": value or None, "count": int(count)} for value, count in rows]
+    return result
+
+
+def rebuild(db: Session):
+    """
+    Recompute every facet from the source tables.
+    """
+    deltas: Counter = Counter()
+    for location, count in db.query(models.JobPosting.location, func.count()).group_by(models.JobPosting.location):
+        deltas[_key("job.location", location)] += count
+    for company_id, count in db.query(models.JobPosting.company_id, func.count()).group_by(models.JobPosting.company_id):
+        deltas[_key("job.company", company_id)] += count
+    for industry, count in (
+        db.query(models.Company.industry, func.count(models.JobPosting.id))
+        .select_from(models.JobPosting)
+        .outerjoin(models.Company, models.Company.id == models.JobPosting.company_id)
+        .group_by(models.Company.industry)
+    ):
+        deltas[_key("job.industry", industry)] += count
+    for status, count in db.query(models.Application.status, func.count()).group_by(models.Application.status):
+        deltas[_key("application.status", status)] += count
+
+    db.query(models.FacetCount).delete()
+    adjust(db, deltas, shard=0)
+    db.commit()
+
+
+def rollup(db: Session) -> int:
+    """
+    Fold every shard into shard 0 and drop values counted down to zero.
+    Returns the number of rows folded.
+    """
+    table = models.FacetCount.__table__
+    key = tuple_(table.c.facet, table.c.value, table.c.shard)
+    locked = (
+        select(table.c.facet, table.c.value, table.c.shard)
+        .where(table.c.shard != 0)
+        .order_by(table.c.facet, table.c.value, table.c.shard)
+        .with_for_update()
+    )
+    # Counts come from the deleted rows, so writes that land first are kept
+    folded = db.execute(
+        table.delete().where(key.in_(locked)).returning(table.c.facet, table.c.value, table.c.count)
+    ).all()
+    deltas: Counter = Counter()
+    for facet, value, count in folded:
+        deltas[(facet, value)] += count
+    adjust(db, deltas, shard=0)
+    db.execute(table.delete().where(table.c.shard == 0, table.c.count == 0))
+    db.commit()
+    return len(folded)
+
+
+class RollupWorker:
+    def __init__(self, interval_seconds: float, session_factory=SessionLocal):
+        self.interval = interval_seconds
+        self.session_factory = session_factory
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="facet-rollup", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            db = self.session_factory()
+            try:
+                rollup(db)
+            except Exception:
+                db.rollback()
+                logger.exception("Facet rollup failed")
+            finally:
+                db.close()
+
+    def stop(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+rollup_worker: Optional[RollupWorker] = None
+if settings.FACET_ROLLUP_INTERVAL_SECONDS > 0:
+    rollup_worker = RollupWorker(settings.FACET_ROLLUP_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    commands = {"rebuild": rebuild, "rollup": rollup}
+    if len(sys.argv) != 2 or sys.argv[1] not in commands:
+        print("Usage: python -m app.services.facets rebuild|rollup")
+        sys.exit(1)
+    db = SessionLocal()
+    try:
+        result = commands[sys.argv[1]](db)
+        print("Facet counts rebuilt" if sys.argv[1] == "rebuild" else f"Folded {result} facet rows")
+    finally:
+        db.close()
@@ -0,0 +1,98 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional
+
+# Bump when the shape of the stored JobDescriptionComponents changes and add a
+# renderer for the new version below
+DESCRIPTION_SCHEMA_VERSION = 1
+
+RENDER_CACHE_SIZE = 1024
+
+
+def normalize_skills(skills: Iterable[str]) -> List[str]:
+    """
+    Lower-case, strip and de-duplicate skills for the required_skills index.
+    """
+    seen = []
+    for skill in skills or []:
+        skill = " ".join(skill.split()).lower()
+        if skill and skill not in seen:
+            seen.append(skill)
+    return seen
+
+
+def _bullets(items: Optional[List[str]]) -> str:
+    return "\n".join(f"• {item}" for item in items or [])
+
+
+def _render_v1(data: Dict[str, Any]) -> str:
+    return f"""
+Title: {data.get("title", "")}
+
+Overview:
+{data.get("overview", "")}
+
+Responsibilities:
+{_bullets(data.get("responsibilities"))}
+
+Required Skills:
+{_bullets(data.get("required_skills"))}
+
+Qualifications:
+{_bullets(data.get("qualifications"))}
+
+Benefits:
+{_bullets(data.get("benefits"))}
+
+Company Culture:
+{data.get("company_culture") or "Not specified"}
+"""
+
+
+RENDERERS = {1: _render_v1}
+
+
+def render_description(data: Dict[str, Any], version: Optional[int] = None) -> str:
+    """
+    Render stored description components as formatted text.
+    """
+    renderer = RENDERERS.get(version or DESCRIPTION_SCHEMA_VERSION)
+    if renderer is None:
+        raise ValueError(f"Unknown job description schema version: {version}")
+    return renderer(data)
+
+
+_render_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_render_cache_lock = Lock()
+
+
+def rendered_description(
+    job_id: Optional[int],
+    description: Optional[str],
+    data: Optional[Dict[str, Any]],
+    version: Optional[int],
+    updated_at: Any = None
+) -> Optional[str]:
+    """
+    Return the text to show for a posting.
+
+    Plain text descriptions win; otherwise the structured components are
+    rendered on first read and cached per (job, version, updated_at).
+    """
+    if description is not None or not data:
+        return description
+    if job_id is None:
+        return render_description(data, version)
+
+    key = (job_id, version, updated_at)
+    with _render_cache_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            return _render_cache[key]
+
+    text = render_description(data, version)
+    with _render_cache_lock:
+        _render_cache[key] = text
+        if len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return text
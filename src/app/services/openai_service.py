@@ -1,4 +1,4 @@
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 from typing import List, Dict, Any
 import os
 from dotenv import load_dotenv
@@ -6,6 +6,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Streaming uses the async client so reading the stream doesn't block the event loop
+async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 def generate_job_description(
     job_title: str,
@@ -59,7 +61,7 @@ async def stream_job_description(
     
     Format the response in a professional and engaging way."""
 
-    stream = client.chat.completions.create(
+    stream = await async_client.chat.completions.create(
         model="gpt-4-turbo-preview",
         messages=[
             {"role": "system", "content": "You are a professional HR writer who creates engaging and detailed job descriptions."},
@@ -70,6 +72,6 @@ async def stream_job_description(
         stream=True
     )
 
-    for chunk in stream:
-        if chunk.choices[0].delta.content is not None:
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content is not None:
             yield chunk.choices[0].delta.content 
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+Read-through cache for hot list queries.
+
+Entries are keyed on the endpoint, its normalized query parameters and the
+current version of every counter the result depends on. Write paths bump
+those counters after committing, so the next read builds a new key and
+misses; entries for old versions are never read again and age out of the
+LRU. Counters are per table (e.g. "Company") or narrower (e.g. the
+postings of one company), so a write only invalidates what it touches.
+
+The "sqlite" backend keeps entries and counters in a local SQLite file so
+every uvicorn worker on the host shares them; "memory" is per process and
+only suitable for a single worker. The default file is named after
+DATABASE_URL so apps on the same host using different databases never share
+entries, and entries are dropped when the app starts because writes made
+while it was down (restores, manual SQL) bumped nothing.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def default_path(database_url: str) -> str:
+    digest = hashlib.sha256(database_url.encode()).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"job_board_query_cache-{digest}.sqlite3")
+
+
+def job_postings_for_company(company_id: int) -> str:
+    return f"JobPosting:company:{company_id}"
+
+
+def table_epoch(table: str) -> str:
+    """
+    Counter every key for `table` depends on; bumped by bulk writes that
+    can't name the narrower counters they touch.
+    """
+    return f"{table}:epoch"
+
+
+def job_posting_counters(*company_ids: Optional[int]) -> List[str]:
+    """
+    Counters to bump after writing postings of the given companies.
+    """
+    return ["JobPosting"] + [job_postings_for_company(c) for c in set(company_ids) if c is not None]
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, str]" = OrderedDict()
+        self.versions: Dict[str, int] = {}
+        self.bumped_at: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def get_versions(self, names: Sequence[str]) -> List[int]:
+        with self.lock:
+            return [self.versions.get(name, 0) for name in names]
+
+    def bump(self, names: Iterable[str]):
+        with self.lock:
+            now = time.time()
+            for name in names:
+                self.versions[name] = self.versions.get(name, 0) + 1
+                self.bumped_at[name] = now
+
+    def last_bumped(self, names: Sequence[str]) -> float:
+        with self.lock:
+            return max((self.bumped_at.get(name, 0.0) for name in names), default=0.0)
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class SQLiteBackend:
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS bumps (name TEXT PRIMARY KEY, at REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None or getattr(self.local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def get_versions(self, names: Sequence[str]) -> List[int]:
+        placeholders = ", ".join("?" for _ in names)
+        rows = dict(self._connect().execute(
+            f"SELECT name, version FROM versions WHERE name IN ({placeholders})", list(names)
+        ))
+        return [rows.get(name, 0) for name in names]
+
+    def bump(self, names: Iterable[str]):
+        conn = self._connect()
+        conn.executemany(
+            "INSERT INTO versions (name, version) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+            [(name,) for name in names]
+        )
+        now = time.time()
+        conn.executemany("INSERT OR REPLACE INTO bumps (name, at) VALUES (?, ?)", [(name, now) for name in names])
+
+    def last_bumped(self, names: Sequence[str]) -> float:
+        placeholders = ", ".join("?" for _ in names)
+        row = self._connect().execute(
+            f"SELECT MAX(at) FROM bumps WHERE name IN ({placeholders})", list(names)
+        ).fetchone()
+        return row[0] or 0.0
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        row = conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+
+    def set(self, key: str, value: str):
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (key, value, accessed) VALUES (?, ?, ?)",
+            (key, value, time.time())
+        )
+        conn.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM entries ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self):
+        self._connect().execute("DELETE FROM entries")
+
+
+class QueryCache:
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    @classmethod
+    def from_settings(cls) -> "QueryCache":
+        if settings.QUERY_CACHE_BACKEND == "sqlite":
+            path = settings.QUERY_CACHE_PATH or default_path(settings.DATABASE_URL)
+            return cls(SQLiteBackend(path, settings.QUERY_CACHE_MAX_ENTRIES))
+        if settings.QUERY_CACHE_BACKEND == "memory":
+            return cls(MemoryBackend(settings.QUERY_CACHE_MAX_ENTRIES))
+        return cls(None)
+
+    def get_or_load(
+        self,
+        name: str,
+        params: Dict[str, Any],
+        depends_on: Sequence[str],
+        loader: Callable[[], Any],
+        min_age: float = 0
+    ) -> Any:
+        """
+        Return the cached result for `name` + `params`, or call `loader`
+        and cache what it returns. `loader` must return JSON-serializable data.
+
+        With `min_age`, the result is not cached if a counter was bumped in
+        the last `min_age` seconds: pass the replica lag window when the
+        loader reads from a replica that may not have the bumping write yet.
+        """
+        if self.backend is None:
+            return loader()
+
+        # A cache that is locked or broken must not fail the read itself
+        try:
+            versions = self.backend.get_versions(depends_on)
+            key = json.dumps(
+                [name, sorted((k, v) for k, v in params.items() if v is not None), list(zip(depends_on, versions))],
+                default=str
+            )
+            cached = self.backend.get(key)
+        except sqlite3.Error:
+            logger.warning("Query cache read failed, loading %s directly", name, exc_info=True)
+            return loader()
+        if cached is not None:
+            return json.loads(cached)
+
+        # Versions were read before loading, so a write that commits while we
+        # load bumps past this key and the possibly stale value is never read
+        value = loader()
+        try:
+            if min_age and time.time() - self.backend.last_bumped(depends_on) < min_age:
+                return value
+            self.backend.set(key, json.dumps(value))
+        except sqlite3.Error:
+            logger.warning("Query cache write failed for %s", name, exc_info=True)
+        return value
+
+    def invalidate(self, *names: str):
+        """
+        Bump counters. Call after the write has been committed; never raises,
+        since the write itself already succeeded.
+        """
+        if self.backend is not None and names:
+            try:
+                self.backend.bump(names)
+            except sqlite3.Error:
+                # Entries keyed on the old versions would stay current
+                logger.warning("Query cache bump failed for %s, clearing it", names, exc_info=True)
+                self.reset()
+
+    def reset(self):
+        """
+        Drop every entry.
+        """
+        if self.backend is not None:
+            try:
+                self.backend.clear()
+            except sqlite3.Error:
+                logger.error("Query cache clear failed; it may serve stale results", exc_info=True)
+
+
+query_cache = QueryCache.from_settings()
@@ -0,0 +1,338 @@
+"""
+Resume skill extraction and candidate ranking.
+
+Skills are found by matching the resume's words against a dictionary of
+canonical skills and their aliases (SKILLS below, extended with
+SKILL_DICTIONARY_PATH) plus the required skills of the posting applied to.
+With RESUME_SKILL_MODEL set, a model is also asked for skills and its
+answer is merged in. Extraction runs in a process pool so long resumes
+don't hold up the API workers.
+
+Skill names are interned in the Skill table and an application's skills
+are stored as a bitset of those ids, so ranking the applicants of a posting
+is one AND + popcount per applicant against the posting's skill mask.
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from sqlalchemy import func, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import models
+from app.services.job_descriptions import normalize_skills
+
+logger = logging.getLogger(__name__)
+
+# Canonical skill -> other ways resumes write it. Names that are also
+# common words ("go", "r", "rest") are left out or only listed in a longer form.
+SKILLS: Dict[str, List[str]] = {
+    "python": [],
+    "java": [],
+    "javascript": ["js", "ecmascript"],
+    "typescript": [],
+    "c++": ["cpp"],
+    "c#": ["csharp", "c sharp"],
+    "golang": ["go lang"],
+    "rust": [],
+    "ruby": [],
+    "php": [],
+    "kotlin": [],
+    "swift": [],
+    "scala": [],
+    "sql": [],
+    "postgresql": ["postgres", "psql"],
+    "mysql": [],
+    "sqlite": [],
+    "mongodb": ["mongo"],
+    "redis": [],
+    "elasticsearch": ["elastic search"],
+    "kafka": ["apache kafka"],
+    "spark": ["apache spark", "pyspark"],
+    "airflow": ["apache airflow"],
+    "react": ["react.js", "reactjs"],
+    "angular": ["angularjs"],
+    "vue": ["vue.js", "vuejs"],
+    "node.js": ["nodejs"],
+    "django": [],
+    "flask": [],
+    "fastapi": [],
+    "spring boot": ["spring framework"],
+    "rest api": ["restful", "rest apis"],
+    "graphql": [],
+    "html": ["html5"],
+    "css": ["css3"],
+    "aws": ["amazon web services"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "azure": ["microsoft azure"],
+    "docker": [],
+    "kubernetes": ["k8s"],
+    "terraform": [],
+    "linux": [],
+    "git": ["github", "gitlab"],
+    "ci/cd": ["continuous integration"],
+    "machine learning": ["ml"],
+    "deep learning": [],
+    "pytorch": ["torch"],
+    "tensorflow": [],
+    "scikit-learn": ["sklearn"],
+    "pandas": [],
+    "numpy": [],
+    "nlp": ["natural language processing"],
+    "data analysis": ["data analytics"],
+    "excel": ["microsoft excel"],
+    "tableau": [],
+    "figma": [],
+    "agile": ["scrum"],
+    "project management": [],
+    "communication": [],
+    "leadership": [],
+}
+
+WORD = re.compile(r"[a-z0-9][a-z0-9+#./-]*")
+# Resume text sent to RESUME_SKILL_MODEL is cut to this length
+MODEL_MAX_CHARS = 20000
+# Model answers past these limits are dropped; every name kept becomes a bit
+MODEL_MAX_SKILLS = 50
+MODEL_MAX_SKILL_LENGTH = 40
+# Serializes Skill id allocation on Postgres
+INTERN_LOCK_ID = 0x4A0E
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+@lru_cache(maxsize=1)
+def dictionary() -> Dict[str, str]:
+    """
+    Alias or canonical name -> canonical name, both as normalized phrases.
+    """
+    entries = dict(SKILLS)
+    if settings.SKILL_DICTIONARY_PATH:
+        with open(settings.SKILL_DICTIONARY_PATH, encoding="utf-8") as f:
+            for skill, aliases in json.load(f).items():
+                entries.setdefault(skill, [])
+                entries[skill] = entries[skill] + list(aliases)
+
+    lookup = {}
+    for skill, aliases in entries.items():
+        canonical = _phrase(skill)
+        for name in [skill] + aliases:
+            lookup[_phrase(name)] = canonical
+    return lookup
+
+
+def _phrase(text: str) -> str:
+    return " ".join(_words(text))
+
+
+def _words(text: str) -> List[str]:
+    # Trailing punctuation belongs to the sentence, not the skill ("Python.")
+    return [word.rstrip(".,/-") for word in WORD.findall(text.lower())]
+
+
+def canonical_skills(skills: Iterable[str]) -> List[str]:
+    """
+    Normalized skills with dictionary aliases replaced by their canonical name.
+    """
+    lookup = dictionary()
+    return normalize_skills(lookup.get(_phrase(skill), skill) for skill in normalize_skills(skills))
+
+
+def dictionary_skills(text: str, extra: Sequence[str] = ()) -> List[str]:
+    """
+    Canonical skills mentioned in `text`, including any of `extra` (e.g. the
+    posting's required skills).
+    """
+    lookup = dict(dictionary())
+    for skill in canonical_skills(extra):
+        lookup.setdefault(_phrase(skill), skill)
+    longest = max((phrase.count(" ") + 1 for phrase in lookup), default=1)
+
+    words = _words(text)
+    found = set()
+    for start in range(len(words)):
+        for size in range(min(longest, len(words) - start), 0, -1):
+            skill = lookup.get(" ".join(words[start:start + size]))
+            if skill is not None:
+                found.add(skill)
+                break
+    return sorted(found)
+
+
+def extract_skills(text: str, extra: Sequence[str] = ()) -> List[str]:
+    """
+    dictionary_skills, plus the model's answer when RESUME_SKILL_MODEL is set.
+    """
+    found = dictionary_skills(text, extra)
+    if settings.RESUME_SKILL_MODEL:
+        found = sorted(set(found) | set(model_skills(text)))
+    return found
+
+
+def model_skills(text: str) -> List[str]:
+    """
+    Ask RESUME_SKILL_MODEL for the resume's skills. Failures are logged and
+    leave the dictionary result as it is.
+    """
+    from openai import OpenAI
+
+    try:
+        response = OpenAI(api_key=settings.OPENAI_API_KEY).chat.completions.create(
+            model=settings.RESUME_SKILL_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "List the professional skills, tools and technologies in this resume. "
+                               "Answer with a JSON array of short lower-case names only."
+                },
+                {"role": "user", "content": text[:MODEL_MAX_CHARS]}
+            ],
+            temperature=0
+        )
+        skills = json.loads(response.choices[0].message.content)
+    except Exception:
+        logger.exception("Model skill extraction failed")
+        return []
+    names = canonical_skills(
+        skill for skill in skills if isinstance(skill, str) and len(skill) <= MODEL_MAX_SKILL_LENGTH
+    )
+    return names[:MODEL_MAX_SKILLS]
+
+
+def _extract_many(items: List[Tuple[str, Sequence[str]]]) -> List[List[str]]:
+    return [extract_skills(text, extra) for text, extra in items]
+
+
+def pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn, not fork: the API process runs background threads
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.RESUME_WORKERS or None,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def extract_in_pool(items: List[Tuple[str, Sequence[str]]], chunk_size: int = 50) -> List[List[str]]:
+    """
+    Run extract_skills over (text, extra) pairs in the process pool, in
+    chunks so one large upload is spread across the workers.
+    """
+    loop = asyncio.get_running_loop()
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    results = await asyncio.gather(*(loop.run_in_executor(pool(), _extract_many, chunk) for chunk in chunks))
+    return [skills for chunk in results for skills in chunk]
+
+
+def intern_skills(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Skill ids for `names`, adding the ones not seen before. Does not commit.
+
+    Ids are the skills' bit positions, so new ones are handed out densely
+    (max id + 1, ...) rather than from a sequence that conflicting inserts
+    would burn through. Postgres serializes this with an advisory lock;
+    elsewhere an insert that loses the race to another writer is retried.
+    """
+    names = sorted(set(names))
+    if not names:
+        return {}
+
+    def known() -> Dict[str, int]:
+        return dict(db.query(models.Skill.name, models.Skill.id).filter(models.Skill.name.in_(names)))
+
+    ids = known()
+    if len(ids) == len(names):
+        return ids
+    if db.get_bind().dialect.name == "postgresql":
+        # Held until commit; look again in case another upload added them meanwhile
+        db.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": INTERN_LOCK_ID})
+        ids = known()
+    while True:
+        next_id = (db.query(func.max(models.Skill.id)).scalar() or 0) + 1
+        missing = [name for name in names if name not in ids]
+        if not missing:
+            return ids
+        try:
+            with db.begin_nested():
+                db.add_all(models.Skill(id=next_id + i, name=name) for i, name in enumerate(missing))
+        except IntegrityError:
+            # Another writer took those ids or names first
+            ids = known()
+            continue
+        ids.update((name, next_id + i) for i, name in enumerate(missing))
+        return ids
+
+
+def pack_bits(ids: Iterable[int]) -> bytes:
+    bits = 0
+    for skill_id in ids:
+        bits |= 1 << skill_id
+    return bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+
+
+def unpack_bits(data: Optional[bytes]) -> int:
+    return int.from_bytes(data or b"", "little")
+
+
+def names_in(bits: int, names_by_id: Dict[int, str]) -> List[str]:
+    return sorted(name for skill_id, name in names_by_id.items() if bits >> skill_id & 1)
+
+
+def job_skills(job: models.JobPosting) -> List[str]:
+    """
+    The posting's required skills, or the dictionary skills in its
+    requirements when it has none.
+    """
+    return canonical_skills(job.required_skills or []) or dictionary_skills(job.requirements or "")
+
+
+def rank(
+    rows: List[Tuple[int, Optional[bytes]]],
+    mask: int,
+    limit: Optional[int] = None
+) -> List[Tuple[int, int, int]]:
+    """
+    (application id, matched skill bits, matched count) for (id, skill_bits)
+    rows, best match first. Scores every row in one numpy pass when numpy
+    is installed.
+    """
+    # Bits above the mask can't match, so only that many bytes are compared
+    width = (mask.bit_length() + 7) // 8
+    if np is not None and rows and width:
+        packed = np.frombuffer(
+            b"".join((data or b"")[:width].ljust(width, b"\0") for _, data in rows), dtype=np.uint8
+        ).reshape(len(rows), width)
+        matched = packed & np.frombuffer(mask.to_bytes(width, "little"), dtype=np.uint8)
+        counts = np.unpackbits(matched, axis=1).sum(axis=1, dtype=np.int64)
+        ids = np.fromiter((application_id for application_id, _ in rows), dtype=np.int64, count=len(rows))
+        order = np.lexsort((ids, -counts))[:limit]
+        return [
+            (int(ids[i]), int.from_bytes(matched[i].tobytes(), "little"), int(counts[i]))
+            for i in order
+        ]
+
+    scored = []
+    for application_id, data in rows:
+        bits = int.from_bytes((data or b"")[:width], "little") & mask
+        scored.append((application_id, bits, bin(bits).count("1")))
+    scored.sort(key=lambda item: (-item[2], item[0]))
+    return scored[:limit]
@@ -0,0 +1,102 @@
+import asyncio
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+
+def sse_event(data: Dict[str, Any], event_id: Optional[int] = None, event: Optional[str] = None) -> bytes:
+    """
+    Encode a payload as a single SSE `data:` frame, optionally with the
+    `id:` clients resume from and an `event:` name.
+    """
+    fields = ""
+    if event_id is not None:
+        fields += f"id: {event_id}\n"
+    if event is not None:
+        fields += f"event: {event}\n"
+    return f"{fields}data: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+class ChunkBatcher:
+    """
+    Coalesce streamed model chunks into SSE frames.
+
+    Chunks are buffered until `max_bytes` is reached or `flush_interval_ms`
+    has elapsed since the first buffered chunk, then written as one
+    `data: {"chunk": ...}` frame. The full text is kept as a list of parts so
+    it can be joined once at the end instead of being rebuilt on every chunk.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        flush_interval_ms: Optional[float] = None
+    ):
+        self.max_bytes = settings.STREAM_FLUSH_BYTES if max_bytes is None else max_bytes
+        interval = settings.STREAM_FLUSH_INTERVAL_MS if flush_interval_ms is None else flush_interval_ms
+        self.flush_interval = interval / 1000
+        self.parts: List[str] = []
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def _frame(self, buffer: List[str]) -> bytes:
+        frame = sse_event({"chunk": "".join(buffer)})
+        self.frames_sent += 1
+        self.bytes_sent += len(frame)
+        return frame
+
+    async def frames(self, chunks: AsyncIterable[str]) -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        iterator = chunks.__aiter__()
+        buffer: List[str] = []
+        buffered = 0
+        deadline = 0.0
+        pending = None
+
+        try:
+            while True:
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+
+                timeout = max(deadline - loop.time(), 0) if buffer else None
+                done, _ = await asyncio.wait({pending}, timeout=timeout)
+                if not done:
+                    # The model paused - flush what we have instead of holding it back
+                    yield self._frame(buffer)
+                    buffer, buffered = [], 0
+                    continue
+
+                task, pending = pending, None
+                try:
+                    chunk = task.result()
+                except StopAsyncIteration:
+                    break
+
+                if not chunk:
+                    continue
+                if not buffer:
+                    deadline = loop.time() + self.flush_interval
+                buffer.append(chunk)
+                self.parts.append(chunk)
+                buffered += len(chunk.encode("utf-8"))
+
+                if buffered >= self.max_bytes or loop.time() >= deadline:
+                    yield self._frame(buffer)
+                    buffer, buffered = [], 0
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+        if buffer:
+            yield self._frame(buffer)
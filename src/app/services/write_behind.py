@@ -0,0 +1,320 @@
+"""
+Write-behind ingestion for application submissions.
+
+With APPLICATION_WRITE_BEHIND enabled, POST /applications validates the
+submission, appends it to a local log and returns 202 straight away. A
+background thread writes the buffered submissions to the Application table
+in one transaction per batch, when WRITE_BEHIND_BATCH_SIZE submissions are
+waiting or every WRITE_BEHIND_FLUSH_INTERVAL_MS.
+
+Each process appends to its own log file in WRITE_BEHIND_DIR and holds an
+flock on it; the file is locked under a temporary name before it is renamed
+to *.log, so another worker's replay never finds it unlocked. Submissions
+are acknowledged once fsynced, and submissions that arrive while an fsync
+is running share the next one (group commit). The byte offset of the flushed prefix is kept next to it, and
+the log is truncated once everything in it is flushed. On startup, logs
+whose owner is gone (the lock can be taken) are replayed and removed.
+(candidate_id, job_id) is unique and flushes insert with ON CONFLICT DO
+NOTHING, so replaying an entry twice, even concurrently, is harmless.
+"""
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import models
+from app.schemas import schemas
+from app.services import facets
+from app.services.change_feed import change_feed
+
+logger = logging.getLogger(__name__)
+
+class ApplicationLog:
+    """
+    Append-only JSONL log of submissions plus the offset of the flushed prefix.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.offset_path = f"{path}.offset"
+        self.fsync = fsync
+        self.file = open(path, "a+b")
+        self.written = self.file.tell()
+        self.synced = self.written
+        self.sync_lock = threading.Lock()
+
+    @classmethod
+    def create(cls, path: str, fsync: bool = True) -> "ApplicationLog":
+        """
+        A new log at `path`, already locked.
+        """
+        log = cls(f"{path}.new", fsync=fsync)
+        log.lock()
+        os.rename(log.path, path)
+        log.path, log.offset_path = path, f"{path}.offset"
+        return log
+
+    def removed(self) -> bool:
+        # Another worker replayed and removed it between listdir and lock
+        return os.fstat(self.file.fileno()).st_nlink == 0
+
+    def lock(self, blocking: bool = True) -> bool:
+        try:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            return True
+        except BlockingIOError:
+            return False
+
+    def append(self, entry: Dict) -> int:
+        """
+        Write one entry and return the byte offset just past it. Callers
+        serialize appends; the entry is durable once sync() returns.
+        """
+        self.file.write(json.dumps(entry).encode("utf-8") + b"\n")
+        self.file.flush()
+        self.written = self.file.tell()
+        return self.written
+
+    def sync(self, offset: int):
+        """
+        Return once everything up to `offset` is on disk. Callers waiting
+        here while another fsync runs are usually covered by it.
+        """
+        if not self.fsync:
+            return
+        with self.sync_lock:
+            if self.synced >= offset:
+                return
+            written = self.written
+            os.fsync(self.file.fileno())
+            self.synced = written
+
+    def flushed_offset(self) -> int:
+        try:
+            with open(self.offset_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def mark_flushed(self, offset: int):
+        tmp_path = f"{self.offset_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(offset))
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.offset_path)
+
+    def unflushed(self) -> List[Tuple[int, Dict]]:
+        self.file.seek(self.flushed_offset())
+        entries = []
+        for line in self.file:
+            if line.endswith(b"\n"):
+                entries.append((self.file.tell(), json.loads(line)))
+        self.file.seek(0, os.SEEK_END)
+        return entries
+
+    def reset(self):
+        # Offset first: a crash in between only replays already flushed entries
+        self.mark_flushed(0)
+        self.file.truncate(0)
+        self.file.seek(0)
+        self.written = self.synced = 0
+
+    def close(self, remove: bool = False):
+        self.file.close()
+        if remove:
+            for path in (self.path, self.offset_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def insert_applications(db, entries: List[Dict]) -> List[Tuple[int, int]]:
+    """
+    Insert a batch idempotently on (candidate_id, job_id) and return the
+    (id, job_id) of the rows actually inserted. Does not commit.
+    """
+    unique: Dict[Tuple[str, int], Dict] = {}
+    for entry in entries:
+        unique.setdefault((entry["candidate_id"], entry["job_id"]), entry)
+
+    job_ids = {job_id for _, job_id in unique}
+    live_jobs = {
+        job_id for (job_id,) in db.query(models.JobPosting.id).filter(models.JobPosting.id.in_(job_ids))
+    }
+    new_entries = []
+    for key, entry in unique.items():
+        if key[1] not in live_jobs:
+            logger.warning("Dropping application %s: job posting %s no longer exists", key[0], key[1])
+            continue
+        new_entries.append(entry)
+    if not new_entries:
+        return []
+
+    table = models.Application.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        inserted = db.execute(
+            insert(table)
+            .on_conflict_do_nothing(index_elements=["candidate_id", "job_id"])
+            .returning(table.c.id, table.c.job_id, table.c.status),
+            new_entries
+        ).all()
+    else:
+        existing = set(
+            db.query(models.Application.candidate_id, models.Application.job_id)
+            .filter(tuple_(models.Application.candidate_id, models.Application.job_id).in_(list(unique)))
+        )
+        rows = [
+            models.Application(**entry) for entry in new_entries
+            if (entry["candidate_id"], entry["job_id"]) not in existing
+        ]
+        db.add_all(rows)
+        db.flush()
+        inserted = [(row.id, row.job_id, row.status) for row in rows]
+
+    facets.adjust(db, facets.new_application_rows([{"status": status} for _, _, status in inserted]))
+    return [(application_id, job_id) for application_id, job_id, _ in inserted]
+
+
+class ApplicationWriteBehind:
+    def __init__(
+        self,
+        directory: str,
+        batch_size: int = 500,
+        flush_interval_ms: float = 200,
+        fsync: bool = True,
+        session_factory=SessionLocal
+    ):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.fsync = fsync
+        self.session_factory = session_factory
+        self.pending: List[Tuple[int, Dict]] = []
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.log: Optional[ApplicationLog] = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.replay_orphans()
+        path = os.path.join(self.directory, f"applications-{os.getpid()}-{uuid.uuid4().hex[:8]}.log")
+        self.log = ApplicationLog.create(path, fsync=self.fsync)
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self._run, name="application-write-behind", daemon=True)
+        self.thread.start()
+
+    def replay_orphans(self):
+        """
+        Flush logs left behind by processes that exited before flushing.
+        """
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".log"):
+                continue
+            log = ApplicationLog(os.path.join(self.directory, name), fsync=self.fsync)
+            if not log.lock(blocking=False):
+                # Still owned by a live worker
+                log.close()
+                continue
+            if log.removed():
+                log.close()
+                continue
+            entries = log.unflushed()
+            if entries:
+                logger.info("Replaying %d unflushed applications from %s", len(entries), name)
+                for start in range(0, len(entries), self.batch_size):
+                    self._write([entry for _, entry in entries[start:start + self.batch_size]])
+            log.close(remove=True)
+
+    def submit(self, application: schemas.ApplicationCreate):
+        entry = application.model_dump()
+        with self.lock:
+            log = self.log
+            offset = log.append(entry)
+            self.pending.append((offset, entry))
+            if len(self.pending) >= self.batch_size:
+                self.wakeup.set()
+        # Outside self.lock so other submissions keep appending meanwhile
+        log.sync(offset)
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                batch = self.pending[:self.batch_size]
+            if not batch:
+                return
+            self._write([entry for _, entry in batch])
+            with self.lock:
+                del self.pending[:len(batch)]
+                if self.pending:
+                    self.log.mark_flushed(batch[-1][0])
+                else:
+                    self.log.reset()
+
+    def _write(self, entries: List[Dict]):
+        db = self.session_factory()
+        try:
+            created = insert_applications(db, entries)
+            db.commit()
+            companies = dict(
+                db.query(models.JobPosting.id, models.JobPosting.company_id)
+                .filter(models.JobPosting.id.in_({job_id for _, job_id in created}))
+            ) if created else {}
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        for application_id, job_id in created:
+            change_feed.publish(
+                "application", "created",
+                application_id=application_id, job_id=job_id, company_id=companies.get(job_id)
+            )
+
+    def _run(self):
+        while not self.stopping.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                while True:
+                    self.flush()
+                    with self.lock:
+                        if len(self.pending) < self.batch_size:
+                            break
+            except Exception:
+                # Entries stay in the log and in memory; retried on the next tick
+                logger.exception("Flushing buffered applications failed")
+
+    def stop(self):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+        while self.pending:
+            self.flush()
+        if self.log is not None:
+            self.log.close(remove=True)
+
+
+write_behind: Optional[ApplicationWriteBehind] = None
+if settings.APPLICATION_WRITE_BEHIND:
+    write_behind = ApplicationWriteBehind(
+        settings.WRITE_BEHIND_DIR,
+        batch_size=settings.WRITE_BEHIND_BATCH_SIZE,
+        flush_interval_ms=settings.WRITE_BEHIND_FLUSH_INTERVAL_MS,
+        fsync=settings.WRITE_BEHIND_FSYNC
+    )
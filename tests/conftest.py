@@ -0,0 +1,6 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+# app.db.session builds its engine on import; tests bind their own databases
+os.environ.setdefault("DATABASE_URL", "sqlite://")
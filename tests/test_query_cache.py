@@ -0,0 +1,113 @@
+import multiprocessing
+import sqlite3
+
+import pytest
+
+from app.services.query_cache import QueryCache, SQLiteBackend
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / "data.sqlite3")
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("CREATE TABLE companies (name TEXT)")
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def read_companies(cache, database):
+    def loader():
+        return [name for (name,) in database.execute("SELECT name FROM companies ORDER BY name")]
+    return cache.get_or_load("read_companies", {"limit": 100}, ["Company"], loader)
+
+
+def write_company(cache, database, name):
+    database.execute("INSERT INTO companies (name) VALUES (?)", (name,))
+    cache.invalidate("Company")
+
+
+def bump_in_other_process(cache_path):
+    QueryCache(SQLiteBackend(cache_path, 100)).invalidate("Company")
+
+
+def test_reads_after_writes_are_fresh(database, cache_path):
+    cache = QueryCache(SQLiteBackend(cache_path, 100))
+
+    write_company(cache, database, "Acme")
+    assert read_companies(cache, database) == ["Acme"]
+    assert read_companies(cache, database) == ["Acme"]
+
+    write_company(cache, database, "Beta")
+    assert read_companies(cache, database) == ["Acme", "Beta"]
+
+
+def test_bump_from_another_connection(database, cache_path):
+    reader = QueryCache(SQLiteBackend(cache_path, 100))
+    writer = QueryCache(SQLiteBackend(cache_path, 100))
+
+    write_company(writer, database, "Acme")
+    assert read_companies(reader, database) == ["Acme"]
+
+    write_company(writer, database, "Beta")
+    assert read_companies(reader, database) == ["Acme", "Beta"]
+
+
+def test_bump_from_another_process(database, cache_path):
+    cache = QueryCache(SQLiteBackend(cache_path, 100))
+    assert read_companies(cache, database) == []
+
+    database.execute("INSERT INTO companies (name) VALUES ('Acme')")
+    process = multiprocessing.get_context("spawn").Process(target=bump_in_other_process, args=(cache_path,))
+    process.start()
+    process.join(30)
+    assert process.exitcode == 0
+
+    assert read_companies(cache, database) == ["Acme"]
+
+
+def test_write_during_load_is_not_cached_as_current(database, cache_path):
+    cache = QueryCache(SQLiteBackend(cache_path, 100))
+
+    def loader():
+        rows = [name for (name,) in database.execute("SELECT name FROM companies ORDER BY name")]
+        # Commits and bumps after the loader read, before its result is stored
+        write_company(cache, database, "Beta")
+        return rows
+
+    assert cache.get_or_load("read_companies", {"limit": 100}, ["Company"], loader) == []
+    assert read_companies(cache, database) == ["Beta"]
+
+
+def test_backend_errors_fall_back_to_loader(database, cache_path):
+    backend = SQLiteBackend(cache_path, 100)
+    cache = QueryCache(backend)
+    write_company(cache, database, "Acme")
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    backend.get = locked
+    assert read_companies(cache, database) == ["Acme"]
+
+    del backend.get
+    backend.set = locked
+    assert read_companies(cache, database) == ["Acme"]
+
+
+def test_failed_bump_clears_instead_of_raising(database, cache_path):
+    backend = SQLiteBackend(cache_path, 100)
+    cache = QueryCache(backend)
+    assert read_companies(cache, database) == []
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    database.execute("INSERT INTO companies (name) VALUES ('Acme')")
+    backend.bump = locked
+    cache.invalidate("Company")
+    assert read_companies(cache, database) == ["Acme"]
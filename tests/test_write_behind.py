@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+
+import pytest
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models import models
+from app.schemas import schemas
+from app.services import facets
+from app.services.write_behind import ApplicationWriteBehind
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'data.sqlite3'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(models.Company(id=1, name="Acme"))
+        db.add_all(models.JobPosting(id=job_id, title=f"Job {job_id}", company_id=1) for job_id in (1, 2))
+        db.commit()
+    engine.dispose()
+    return url
+
+
+def application(number, job_id=1):
+    return schemas.ApplicationCreate(
+        job_id=job_id, candidate_id=f"cand{number}", name=f"Candidate {number}", email=f"cand{number}@example.com"
+    )
+
+
+def writer(directory, database_url):
+    return ApplicationWriteBehind(
+        directory, batch_size=100, flush_interval_ms=3_600_000, fsync=False,
+        session_factory=sessionmaker(bind=create_engine(database_url))
+    )
+
+
+def crash_after_first_batch(directory, database_url):
+    write_behind = writer(directory, database_url)
+    write_behind.start()
+    for number in range(10):
+        write_behind.submit(application(number))
+    # Resubmitted by a client that retried
+    write_behind.submit(application(0))
+    write_behind.submit(application(0, job_id=2))
+
+    # Dies after the first batch commits but before the log records it
+    write_behind.batch_size = 4
+    write_behind.log.mark_flushed = lambda offset: os._exit(1)
+    write_behind.flush()
+
+
+def test_replay_after_crash_inserts_each_pair_once(tmp_path, database_url):
+    directory = str(tmp_path / "write_behind")
+    process = multiprocessing.get_context("spawn").Process(
+        target=crash_after_first_batch, args=(directory, database_url)
+    )
+    process.start()
+    process.join(30)
+    assert process.exitcode == 1
+
+    engine = create_engine(database_url)
+    with sessionmaker(bind=engine)() as db:
+        assert db.query(models.Application).count() == 4
+
+    writer(directory, database_url).replay_orphans()
+    # A second replay, e.g. by another worker, finds nothing left to do
+    writer(directory, database_url).replay_orphans()
+    assert not [name for name in os.listdir(directory) if name.endswith(".log")]
+
+    with sessionmaker(bind=engine)() as db:
+        pairs = (
+            db.query(models.Application.candidate_id, models.Application.job_id, func.count())
+            .group_by(models.Application.candidate_id, models.Application.job_id)
+            .all()
+        )
+        assert sorted((candidate_id, job_id) for candidate_id, job_id, _ in pairs) == sorted(
+            [(f"cand{number}", 1) for number in range(10)] + [("cand0", 2)]
+        )
+        assert all(count == 1 for _, _, count in pairs)
+        assert facets.read(db, facets.APPLICATION_FACETS, "application")["status"] == [
+            {"value": "Pending", "count": 11}
+        ]